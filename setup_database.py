@@ -109,6 +109,41 @@ def check_database_connection():
         return False
 
 
+def cluster_tables():
+    """Reorder child tables by their parent key (run in a maintenance window)"""
+    print("🗂️  Clustering child tables...")
+    
+    try:
+        from database import cluster_tables as run_cluster
+        run_cluster()
+        print("✅ Tables clustered and analyzed!")
+        return True
+    except Exception as e:
+        print(f"❌ Failed to cluster tables: {e}")
+        return False
+
+
+def migrate_schema():
+    """Upgrade tables created by an earlier release to the current schema"""
+    print("🔄 Migrating database schema...")
+    
+    try:
+        from database import config
+        from database.migrations import migrate_schema as run_migration
+        if not config.initialize_database_connection():
+            print("❌ Database is not configured!")
+            return False
+        
+        if run_migration(config.engine):
+            print("✅ Database schema migrated!")
+        else:
+            print("✅ Nothing to migrate")
+        return True
+    except Exception as e:
+        print(f"❌ Schema migration failed (no changes were applied): {e}")
+        return False
+
+
 def main():
     """Main setup function"""
     print("🚀 KYC Document Analyzer - Database Setup")
@@ -152,5 +187,10 @@ def main():
 
 
 if __name__ == "__main__":
-    success = main()
+    if "--migrate" in sys.argv[1:]:
+        success = migrate_schema()
+    elif "--cluster" in sys.argv[1:]:
+        success = cluster_tables()
+    else:
+        success = main()
     sys.exit(0 if success else 1)
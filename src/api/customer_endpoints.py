@@ -1,6 +1,8 @@
 """
 Customer management API endpoints
 """
+import uuid
+from datetime import datetime
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query, Path
 from fastapi.responses import JSONResponse
@@ -14,12 +16,31 @@ from models.customer_models import (
 )
 from services.customer_service import customer_service
 from database.models import KYCStatus, RiskLevel
+from database.repositories import encode_cursor, decode_cursor
 
+# Handlers are plain functions: the customer service does blocking database I/O,
+# so FastAPI runs them on its threadpool instead of stalling the event loop
 router = APIRouter(prefix="/customers", tags=["Customer Management"])
 
 
+def _decode_customer_cursor(cursor: str) -> tuple:
+    """Turn a customer list cursor into the (created_at, customer_id) keyset"""
+    try:
+        return decode_cursor(cursor, datetime.fromisoformat, uuid.UUID)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+def _next_customer_cursor(customers_data: List[dict]) -> Optional[str]:
+    """Cursor pointing after the last customer of a page"""
+    if not customers_data:
+        return None
+    last = customers_data[-1]
+    return encode_cursor(last['created_at'], last['customer_id'])
+
+
 @router.post("/", response_model=CustomerResponse, status_code=201)
-async def create_customer(
+def create_customer(
     customer_data: CustomerCreate,
     current_user: User = Depends(require_permission(Permission.EDIT_CUSTOMER_DATA))
 ):
@@ -38,7 +59,7 @@ async def create_customer(
 
 
 @router.get("/", response_model=CustomerListResponse)
-async def list_customers(
+def list_customers(
     query: Optional[str] = Query(None, description="Search query for name, email, or phone"),
     kyc_status: Optional[List[KYCStatus]] = Query(None, description="Filter by KYC status"),
     risk_level: Optional[List[RiskLevel]] = Query(None, description="Filter by risk level"),
@@ -46,6 +67,7 @@ async def list_customers(
     is_active: Optional[bool] = Query(None, description="Filter by active status"),
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(50, ge=1, le=1000, description="Page size"),
+    cursor: Optional[str] = Query(None, description="Keyset cursor from a previous page (overrides page)"),
     current_user: User = Depends(require_permission(Permission.VIEW_CUSTOMER_DATA))
 ):
     """
@@ -68,17 +90,16 @@ async def list_customers(
         # Add pagination
         filters['limit'] = page_size
         filters['offset'] = (page - 1) * page_size
+        if cursor:
+            filters['after'] = _decode_customer_cursor(cursor)
         
         # Search customers
-        customers_data = customer_service.search_customers(
+        customers_data, total_count = customer_service.search_customers(
             query=query or "",
             filters=filters,
             requesting_user_id=current_user.user_id
         )
         
-        # For this demo, we'll calculate pagination info
-        # In production, you'd get this from the repository
-        total_count = len(customers_data)  # This would be a separate count query
         has_next = len(customers_data) == page_size
         has_previous = page > 1
         
@@ -90,15 +111,18 @@ async def list_customers(
             page=page,
             page_size=page_size,
             has_next=has_next,
-            has_previous=has_previous
+            has_previous=has_previous,
+            next_cursor=_next_customer_cursor(customers_data) if has_next else None
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to list customers: {str(e)}")
 
 
 @router.get("/{customer_id}", response_model=CustomerDetailResponse)
-async def get_customer(
+def get_customer(
     customer_id: str = Path(..., description="Customer ID"),
     include_documents: bool = Query(True, description="Include customer documents"),
     include_sessions: bool = Query(True, description="Include KYC sessions"),
@@ -110,31 +134,20 @@ async def get_customer(
     Requires permission: VIEW_CUSTOMER_DATA
     """
     try:
-        # Get customer basic info
-        customer_data = customer_service.get_customer(customer_id, current_user.user_id)
-        if not customer_data:
+        # Get customer with the requested related data in one pass
+        response_data = customer_service.get_customer_detail(
+            customer_id, current_user.user_id, include_documents, include_sessions
+        )
+        if not response_data:
             raise HTTPException(status_code=404, detail="Customer not found")
         
-        # Build detailed response
-        response_data = customer_data.copy()
-        response_data['documents'] = []
-        response_data['kyc_sessions'] = []
-        response_data['total_documents'] = 0
-        response_data['latest_session'] = None
-        
-        # Get documents if requested
-        if include_documents:
-            documents_data = customer_service.get_customer_documents(customer_id, current_user.user_id)
-            response_data['documents'] = [DocumentSummary(**doc) for doc in documents_data]
-            response_data['total_documents'] = len(documents_data)
-        
-        # Get KYC sessions if requested
-        if include_sessions:
-            sessions_data = customer_service.get_customer_kyc_sessions(customer_id, current_user.user_id)
-            response_data['kyc_sessions'] = [KYCSessionSummary(**session) for session in sessions_data]
-            if sessions_data:
-                # Get latest session (assuming sorted by created_at desc)
-                response_data['latest_session'] = KYCSessionSummary(**sessions_data[0])
+        documents_data = response_data['documents']
+        sessions_data = response_data['kyc_sessions']
+        response_data['documents'] = [DocumentSummary(**doc) for doc in documents_data]
+        response_data['kyc_sessions'] = [KYCSessionSummary(**session) for session in sessions_data]
+        response_data['total_documents'] = len(documents_data)
+        # Sessions are sorted by created_at desc
+        response_data['latest_session'] = response_data['kyc_sessions'][0] if sessions_data else None
         
         return CustomerDetailResponse(**response_data)
         
@@ -145,7 +158,7 @@ async def get_customer(
 
 
 @router.put("/{customer_id}", response_model=CustomerResponse)
-async def update_customer(
+def update_customer(
     customer_id: str = Path(..., description="Customer ID"),
     customer_updates: CustomerUpdate = ...,
     current_user: User = Depends(require_permission(Permission.EDIT_CUSTOMER_DATA))
@@ -173,7 +186,7 @@ async def update_customer(
 
 
 @router.patch("/{customer_id}/kyc-status", response_model=CustomerResponse)
-async def update_kyc_status(
+def update_kyc_status(
     customer_id: str = Path(..., description="Customer ID"),
     status_update: KYCStatusUpdate = ...,
     current_user: User = Depends(require_permission(Permission.EDIT_CUSTOMER_DATA))
@@ -203,7 +216,7 @@ async def update_kyc_status(
 
 
 @router.get("/{customer_id}/documents", response_model=List[DocumentSummary])
-async def get_customer_documents(
+def get_customer_documents(
     customer_id: str = Path(..., description="Customer ID"),
     current_user: User = Depends(require_permission(Permission.VIEW_DOCUMENT))
 ):
@@ -221,7 +234,7 @@ async def get_customer_documents(
 
 
 @router.get("/{customer_id}/kyc-sessions", response_model=List[KYCSessionSummary])
-async def get_customer_kyc_sessions(
+def get_customer_kyc_sessions(
     customer_id: str = Path(..., description="Customer ID"),
     current_user: User = Depends(require_permission(Permission.VIEW_CUSTOMER_DATA))
 ):
@@ -239,7 +252,7 @@ async def get_customer_kyc_sessions(
 
 
 @router.get("/statistics/dashboard", response_model=CustomerStatistics)
-async def get_customer_statistics(
+def get_customer_statistics(
     current_user: User = Depends(require_permission(Permission.VIEW_ANALYTICS))
 ):
     """
@@ -256,7 +269,7 @@ async def get_customer_statistics(
 
 
 @router.post("/search", response_model=CustomerListResponse)
-async def search_customers(
+def search_customers(
     search_params: CustomerSearch,
     current_user: User = Depends(require_permission(Permission.VIEW_CUSTOMER_DATA))
 ):
@@ -267,17 +280,18 @@ async def search_customers(
     """
     try:
         # Convert search params to filters
-        filters = search_params.dict(exclude_unset=True, exclude={'query'})
+        filters = search_params.dict(exclude_unset=True, exclude={'query', 'cursor'})
+        if search_params.cursor:
+            filters['after'] = _decode_customer_cursor(search_params.cursor)
         
         # Search customers
-        customers_data = customer_service.search_customers(
+        customers_data, total_count = customer_service.search_customers(
             query=search_params.query or "",
             filters=filters,
             requesting_user_id=current_user.user_id
         )
         
-        # Calculate pagination (simplified for demo)
-        total_count = len(customers_data)
+        # Calculate pagination
         page = (filters.get('offset', 0) // filters.get('limit', 50)) + 1
         page_size = filters.get('limit', 50)
         has_next = len(customers_data) == page_size
@@ -291,8 +305,11 @@ async def search_customers(
             page=page,
             page_size=page_size,
             has_next=has_next,
-            has_previous=has_previous
+            has_previous=has_previous,
+            next_cursor=_next_customer_cursor(customers_data) if has_next else None
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to search customers: {str(e)}")
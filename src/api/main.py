@@ -22,7 +22,9 @@ from models.kyc_models import (
 )
 from services.upload_service import upload_service
 from auth.endpoints import router as auth_router
-from database.config import init_database
+from database.config import init_database, check_database_health, get_session_local
+from database.repositories import audit_log_buffer
+from utils.audit_logger import audit_logger
 
 # Initialize database on startup
 @asynccontextmanager
@@ -39,10 +41,16 @@ async def lifespan(app: FastAPI):
         print(f"❌ Database initialization failed: {e}")
         # Don't crash the app, but log the error
     
+    # Persist audit events to the database in batches
+    if get_session_local() is not None:
+        audit_logger.attach_db_buffer(audit_log_buffer)
+    
     yield
     
     # Shutdown
     print("👋 Shutting down KYC Document Analyzer...")
+    audit_logger.attach_db_buffer(None)
+    audit_log_buffer.flush()
 
 app = FastAPI(
     title="KYC Document Analyzer",
@@ -93,6 +101,13 @@ async def health_check():
         "timestamp": "2025-09-16T12:00:00Z"
     }
 
+@app.get("/health/database")
+def database_health_check():
+    """Database connectivity check, run outside any request session"""
+    if not check_database_health():
+        raise HTTPException(status_code=503, detail="Database unavailable")
+    return {"status": "healthy", "service": "database"}
+
 @app.post("/upload-document", response_model=UploadResponse)
 async def upload_document(
     file: UploadFile = File(..., description="Document file to upload"),
@@ -2,9 +2,12 @@
 Authentication and authorization middleware
 """
 import os
-from datetime import datetime, timedelta, timezone
+import asyncio
+import hashlib
+from datetime import timedelta
 from typing import Optional, Dict, Any
 from fastapi import HTTPException, Depends, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
 from auth.models import User, UserRole, Permission, AccessLog
@@ -13,13 +16,17 @@ from database.config import SessionLocal
 from database.repositories import get_user_repo
 from utils.audit_logger import log_security_event, AuditLevel
 
-class AuthenticationError(Exception):
-    """Authentication related errors"""
-    pass
+class AuthenticationError(HTTPException):
+    """Authentication related errors (HTTP 401)"""
+    
+    def __init__(self, detail: str):
+        super().__init__(status_code=401, detail=detail)
 
-class AuthorizationError(Exception):
-    """Authorization related errors"""
-    pass
+class AuthorizationError(HTTPException):
+    """Authorization related errors (HTTP 403)"""
+    
+    def __init__(self, detail: str):
+        super().__init__(status_code=403, detail=detail)
 
 def get_db():
     """Get database session"""
@@ -32,6 +39,11 @@ def get_db():
 class AuthService:
     """Authentication and authorization service with database integration"""
     
+    def __init__(self):
+        # In-flight token verifications, shared by concurrent requests for the same token
+        # and keyed by its SHA-256 digest so live credentials are not kept as keys
+        self._inflight_verifications: Dict[bytes, asyncio.Future] = {}
+    
     def authenticate_user(self, username: str, password: str, ip_address: str = None) -> Dict[str, Any]:
         """Authenticate user and return token"""
         db = get_db()
@@ -39,8 +51,9 @@ class AuthService:
         try:
             user_repo = get_user_repo(db)
             
-            # Find user by username
-            db_user = user_repo.get_user_by_username(username)
+            # Find user by username, bypassing the per-process user cache so
+            # credential and lockout changes from other workers apply at once
+            db_user = user_repo.get_user_by_username(username, use_cache=False)
             
             if not db_user:
                 log_security_event(
@@ -52,18 +65,7 @@ class AuthService:
                 raise AuthenticationError("Invalid credentials")
             
             # Convert DB user to auth model
-            user = User(
-                user_id=str(db_user.user_id),
-                username=db_user.username,
-                email=db_user.email,
-                role=UserRole(db_user.role),
-                is_active=db_user.is_active,
-                created_at=db_user.created_at,
-                last_login=db_user.last_login,
-                failed_login_attempts=db_user.failed_login_attempts or 0,
-                locked_until=db_user.locked_until,
-                department=db_user.department
-            )
+            user = User.from_db(db_user)
             
             # Check if account is locked
             if user.is_locked():
@@ -89,14 +91,11 @@ class AuthService:
             
             # Verify password
             if not jwt_manager.verify_password(password, db_user.password_hash):
-                # Increment failed attempts
-                user_repo.increment_failed_login_attempts(str(db_user.user_id))
+                # Increment failed attempts, locking the account at the threshold
+                result = user_repo.bump_failed_login(str(db_user.user_id), threshold=5,
+                                                     lock_duration=timedelta(hours=1))
                 
-                # Check if should lock account
-                if (db_user.failed_login_attempts or 0) + 1 >= 5:
-                    lock_until = datetime.now(timezone.utc) + timedelta(hours=1)
-                    user_repo.lock_user(str(db_user.user_id), lock_until)
-                    
+                if result is not None and result.failed_login_attempts >= 5:
                     log_security_event(
                         event_type="account_locked",
                         description=f"Account locked due to failed login attempts: {username}",
@@ -114,9 +113,15 @@ class AuthService:
                 )
                 raise AuthenticationError("Invalid credentials")
             
+            # Upgrade legacy or weaker hashes to the configured scheme
+            if jwt_manager.needs_rehash(db_user.password_hash):
+                user_repo.update_user(
+                    str(db_user.user_id),
+                    {"password_hash": jwt_manager.hash_password(password)}
+                )
+            
             # Reset failed attempts and update last login
-            user_repo.reset_failed_login_attempts(str(db_user.user_id))
-            user_repo.update_last_login(str(db_user.user_id))
+            user_repo.record_successful_login(str(db_user.user_id))
             
             # Create token pair
             token_data = jwt_manager.create_token_pair(user)
@@ -142,33 +147,35 @@ class AuthService:
             db = get_db()
             try:
                 user_repo = get_user_repo(db)
-                db_user = user_repo.get_user_by_id(user_data["user_id"])
+                db_user = user_repo.get_user(user_data["user_id"])
                 
                 if not db_user or not db_user.is_active:
                     raise AuthenticationError("User not found or inactive")
                 
                 # Convert to auth model
-                user = User(
-                    user_id=str(db_user.user_id),
-                    username=db_user.username,
-                    email=db_user.email,
-                    role=UserRole(db_user.role),
-                    is_active=db_user.is_active,
-                    created_at=db_user.created_at,
-                    last_login=db_user.last_login,
-                    failed_login_attempts=db_user.failed_login_attempts or 0,
-                    locked_until=db_user.locked_until,
-                    department=db_user.department
-                )
+                user = User.from_db(db_user)
                 
                 return user
                 
             finally:
                 db.close()
                 
+        except HTTPException as e:
+            raise AuthenticationError(f"Token verification failed: {e.detail}")
         except Exception as e:
             raise AuthenticationError(f"Token verification failed: {str(e)}")
     
+    async def verify_token_async(self, token: str) -> User:
+        """Verify JWT token off the event loop, coalescing concurrent calls per token"""
+        key = hashlib.sha256(token.encode()).digest()
+        future = self._inflight_verifications.get(key)
+        if future is None:
+            future = asyncio.ensure_future(run_in_threadpool(self.verify_token, token))
+            self._inflight_verifications[key] = future
+            future.add_done_callback(lambda _: self._inflight_verifications.pop(key, None))
+        # Shield so one cancelled request does not cancel the others waiting on it
+        return await asyncio.shield(future)
+    
     def create_user(self, user_data: Dict[str, Any], creator_user_id: str) -> User:
         """Create new user"""
         db = get_db()
@@ -177,19 +184,11 @@ class AuthService:
             user_repo = get_user_repo(db)
             
             # Check if creator has permission
-            creator_db = user_repo.get_user_by_id(creator_user_id)
+            creator_db = user_repo.get_user(creator_user_id)
             if not creator_db:
                 raise AuthorizationError("Creator not found")
             
-            creator_user = User(
-                user_id=str(creator_db.user_id),
-                username=creator_db.username,
-                email=creator_db.email,
-                role=UserRole(creator_db.role),
-                is_active=creator_db.is_active,
-                created_at=creator_db.created_at,
-                department=creator_db.department
-            )
+            creator_user = User.from_db(creator_db)
             
             if not creator_user.has_permission(Permission.MANAGE_USERS):
                 raise AuthorizationError("Insufficient permissions to create users")
@@ -202,15 +201,7 @@ class AuthService:
             db_user = user_repo.create_user(user_data)
             
             # Convert to auth model
-            user = User(
-                user_id=str(db_user.user_id),
-                username=db_user.username,
-                email=db_user.email,
-                role=UserRole(db_user.role),
-                is_active=db_user.is_active,
-                created_at=db_user.created_at,
-                department=db_user.department
-            )
+            user = User.from_db(db_user)
             
             log_security_event(
                 event_type="user_created",
@@ -231,23 +222,12 @@ class AuthService:
         
         try:
             user_repo = get_user_repo(db)
-            db_user = user_repo.get_user_by_id(user_id)
+            db_user = user_repo.get_user(user_id)
             
             if not db_user:
                 return None
             
-            return User(
-                user_id=str(db_user.user_id),
-                username=db_user.username,
-                email=db_user.email,
-                role=UserRole(db_user.role),
-                is_active=db_user.is_active,
-                created_at=db_user.created_at,
-                last_login=db_user.last_login,
-                failed_login_attempts=db_user.failed_login_attempts or 0,
-                locked_until=db_user.locked_until,
-                department=db_user.department
-            )
+            return User.from_db(db_user)
             
         finally:
             db.close()
@@ -263,18 +243,7 @@ class AuthService:
             if not db_user:
                 return None
             
-            return User(
-                user_id=str(db_user.user_id),
-                username=db_user.username,
-                email=db_user.email,
-                role=UserRole(db_user.role),
-                is_active=db_user.is_active,
-                created_at=db_user.created_at,
-                last_login=db_user.last_login,
-                failed_login_attempts=db_user.failed_login_attempts or 0,
-                locked_until=db_user.locked_until,
-                department=db_user.department
-            )
+            return User.from_db(db_user)
             
         finally:
             db.close()
@@ -304,13 +273,9 @@ auth_service = AuthService()
 # FastAPI dependencies
 security = HTTPBearer()
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> User:
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> User:
     """Dependency to get current authenticated user"""
-    try:
-        user = auth_service.verify_token(credentials.credentials)
-        return user
-    except AuthenticationError as e:
-        raise HTTPException(status_code=401, detail=str(e))
+    return await auth_service.verify_token_async(credentials.credentials)
 
 def require_permission(permission: Permission):
     """Dependency factory to require specific permission"""
@@ -4,7 +4,10 @@ Simple authentication for development and testing without 2FA
 """
 import streamlit as st
 from typing import Dict, Any, Optional
+import hashlib
+import hmac
 import requests
+from requests.adapters import HTTPAdapter
 import json
 
 # Default development users
@@ -26,18 +29,32 @@ DEV_USERS = {
     }
 }
 
+# Password digests for development users, computed once at import
+_DEV_HASHES = {
+    username: hashlib.sha256(info["password"].encode()).digest()
+    for username, info in DEV_USERS.items()
+}
+
 class DevAuth:
     """Development authentication system"""
     
     def __init__(self):
         self.api_base = "http://localhost:8000"
+        
+        # Reuse connections to the API across login attempts
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
     
     def login(self, username: str, password: str) -> Dict[str, Any]:
         """Simple login without 2FA"""
         # Check development users first
-        if username in DEV_USERS:
+        expected_hash = _DEV_HASHES.get(username)
+        if expected_hash is not None:
             dev_user = DEV_USERS[username]
-            if password == dev_user["password"]:
+            password_hash = hashlib.sha256(password.encode()).digest()
+            if hmac.compare_digest(password_hash, expected_hash):
                 return {
                     "success": True,
                     "token": f"dev_token_{username}",
@@ -50,10 +67,10 @@ class DevAuth:
         
         # Try API authentication (without 2FA)
         try:
-            response = requests.post(
+            response = self._session.post(
                 f"{self.api_base}/auth/login",
                 json={"username": username, "password": password},
-                timeout=5
+                timeout=(1, 5)
             )
             
             if response.status_code == 200:
@@ -76,20 +93,19 @@ class DevAuth:
     
     def is_authenticated(self) -> bool:
         """Check if user is authenticated"""
-        return "auth_token" in st.session_state and st.session_state.auth_token is not None
+        return st.session_state.get("auth_token") is not None
     
     def get_current_user(self) -> Optional[Dict[str, Any]]:
         """Get current authenticated user"""
-        if self.is_authenticated():
+        if st.session_state.get("auth_token") is not None:
             return st.session_state.get("current_user")
         return None
     
     def logout(self):
         """Logout current user"""
-        if "auth_token" in st.session_state:
-            del st.session_state.auth_token
-        if "current_user" in st.session_state:
-            del st.session_state.current_user
+        for key in ("auth_token", "current_user", "_auth_cache"):
+            if key in st.session_state:
+                del st.session_state[key]
 
 # Global auth instance
 dev_auth = DevAuth()
@@ -144,16 +160,23 @@ def show_login_form():
 
 def require_auth(required_role: str = None):
     """Decorator to require authentication"""
-    if not dev_auth.is_authenticated():
+    token = st.session_state.get("auth_token")
+    if token is None:
         st.warning("🔒 Please login to access this page")
         show_login_form()
         st.stop()
     
-    user = dev_auth.get_current_user()
+    user = st.session_state.get("current_user")
+    
+    # Skip the role check on reruns that already passed it with this token
+    if st.session_state.get("_auth_cache") == (token, required_role):
+        return user
+    
     if required_role and user.get("role") != required_role:
         st.error(f"❌ Access denied. Required role: {required_role}")
         st.stop()
     
+    st.session_state._auth_cache = (token, required_role)
     return user
 
 def show_user_info():
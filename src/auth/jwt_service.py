@@ -2,82 +2,315 @@
 JWT Token authentication service
 """
 import os
-from datetime import datetime, timedelta, timezone
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import cached_property
+from datetime import timedelta
 from typing import Optional, Dict, Any
 import jwt
-from passlib.context import CryptContext
 from fastapi import HTTPException, status
-from auth.models import User, UserRole
+from auth.models import User, PERMISSION_BY_VALUE, to_role
+
+try:
+    import orjson
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+except ImportError:
+    # Fall back to the stdlib encoder when orjson is unavailable
+    def _json_dumps(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+    _json_loads = json.loads
+
+
+# Token type claim ("t") values
+TOKEN_TYPE_ACCESS = 0
+TOKEN_TYPE_REFRESH = 1
+
+
+# Details for the fixed-message rejection paths. A fresh HTTPException is raised
+# each time: raising sets __traceback__/__context__ on the instance itself, so a
+# shared instance would mix frames across concurrently verifying threads.
+_DETAIL_BAD_TYPE = "Invalid token type"
+_DETAIL_EXPIRED = "Token expired"
+_DETAIL_BAD_PAYLOAD = "Invalid token payload"
+
+# An unpadded base64url JWT segment
+_SEGMENT_RE = re.compile(r"[A-Za-z0-9_-]*")
+
+
+class _TokenCache:
+    """Bounded LRU cache of dicts whose entries expire at a per-entry deadline
+    
+    Values are copied in and out, so callers never share a dict with each other.
+    """
+    
+    def __init__(self, maxsize: int, ttl: int):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: bytes) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached value, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return dict(value)
+    
+    def set(self, key: bytes, value: Dict[str, Any], expires_at: float):
+        """Store a copy of value until min(expires_at, now + ttl)"""
+        expires_at = min(expires_at, time.time() + self.ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, dict(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        """Drop all cached entries"""
+        with self._lock:
+            self._entries.clear()
 
 
 class JWTManager:
     """JWT token management"""
     
-    def __init__(self):
+    def __init__(self, bcrypt_rounds: Optional[int] = None, password_scheme: Optional[str] = None):
         self.secret_key = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-in-production")
         self.algorithm = "HS256"
         self.access_token_expire_minutes = int(os.getenv("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
         self.refresh_token_expire_days = int(os.getenv("JWT_REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+        self._access_token_ttl = self.access_token_expire_minutes * 60
+        self._refresh_token_ttl = self.refresh_token_expire_days * 86400
+        
+        # Preloaded key material reused on every verify; the keyed HMAC is
+        # copied per token so the key schedule is only computed once
+        self._key = self.secret_key.encode("utf-8")
+        self._hmac = hmac.new(self._key, digestmod=hashlib.sha256)
+        self._header_segment = self._b64encode(_json_dumps({"alg": self.algorithm, "typ": "JWT"}))
+        self._required_claims = ("exp", "sub")
         
-        # Password hashing
-        self.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+        # Short-lived cache of verified payloads so repeat tokens skip decoding
+        cache_ttl = int(os.getenv("JWT_CACHE_TTL", "10"))
+        cache_size = int(os.getenv("JWT_CACHE_SIZE", "10000"))
+        self._payload_cache = _TokenCache(maxsize=cache_size, ttl=cache_ttl)
+        
+        # Password hashing: new hashes use password_scheme, existing hashes
+        # are verified by the scheme named in their prefix
+        self.password_scheme = password_scheme or os.getenv("PASSWORD_HASH_SCHEME", "argon2id")
+        if self.password_scheme not in ("argon2id", "bcrypt"):
+            raise ValueError(f"Unsupported password hash scheme: {self.password_scheme}")
+        if bcrypt_rounds is None:
+            bcrypt_rounds = int(os.getenv("BCRYPT_ROUNDS", "12"))
+        self.bcrypt_rounds = bcrypt_rounds
+    
+    @cached_property
+    def _argon2(self):
+        """Argon2id hasher, imported on first password operation"""
+        from argon2 import PasswordHasher
+        return PasswordHasher(
+            time_cost=int(os.getenv("ARGON2_TIME_COST", "2")),
+            memory_cost=int(os.getenv("ARGON2_MEMORY_COST_KIB", "65536")),
+            parallelism=int(os.getenv("ARGON2_PARALLELISM", "2"))
+        )
+    
+    @cached_property
+    def _bcrypt(self):
+        """bcrypt module, imported on first password operation"""
+        import bcrypt
+        return bcrypt
+    
+    @staticmethod
+    def _password_bytes(password: str) -> bytes:
+        """Encode a password for bcrypt, which only uses the first 72 bytes"""
+        return password.encode("utf-8")[:72]
+    
+    @staticmethod
+    def _hash_scheme(hashed_password: str) -> Optional[str]:
+        """Identify the scheme of a stored hash from its prefix"""
+        if hashed_password.startswith("$argon2id$"):
+            return "argon2id"
+        if hashed_password.startswith(("$2b$", "$2a$", "$2y$")):
+            return "bcrypt"
+        return None
     
     def verify_password(self, plain_password: str, hashed_password: str) -> bool:
         """Verify a password against its hash"""
-        return self.pwd_context.verify(plain_password, hashed_password)
+        scheme = self._hash_scheme(hashed_password)
+        if scheme == "argon2id":
+            from argon2.exceptions import InvalidHashError, VerificationError
+            try:
+                return self._argon2.verify(hashed_password, plain_password)
+            except (VerificationError, InvalidHashError):
+                return False
+        if scheme == "bcrypt":
+            try:
+                return self._bcrypt.checkpw(self._password_bytes(plain_password), hashed_password.encode("utf-8"))
+            except ValueError:
+                return False
+        # Unknown or malformed hash
+        return False
     
     def hash_password(self, password: str) -> str:
-        """Hash a password"""
-        return self.pwd_context.hash(password)
+        """Hash a password with the configured scheme"""
+        if self.password_scheme == "bcrypt":
+            salt = self._bcrypt.gensalt(rounds=self.bcrypt_rounds)
+            return self._bcrypt.hashpw(self._password_bytes(password), salt).decode("utf-8")
+        return self._argon2.hash(password)
     
-    def create_access_token(self, data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """Check if a hash uses another scheme or weaker parameters than configured"""
+        scheme = self._hash_scheme(hashed_password)
+        if scheme != self.password_scheme:
+            return scheme is not None
+        if scheme == "argon2id":
+            return self._argon2.check_needs_rehash(hashed_password)
+        try:
+            cost = int(hashed_password.split("$")[2])
+        except (IndexError, ValueError):
+            return False
+        return cost < self.bcrypt_rounds
+    
+    def create_access_token(self, sub: str, username: str, role: str, email: str,
+                            expires_delta: Optional[timedelta] = None) -> str:
         """Create JWT access token"""
-        to_encode = data.copy()
-        
         if expires_delta:
-            expire = datetime.now(timezone.utc) + expires_delta
+            expire = int(time.time() + expires_delta.total_seconds())
         else:
-            expire = datetime.now(timezone.utc) + timedelta(minutes=self.access_token_expire_minutes)
+            expire = int(time.time()) + self._access_token_ttl
         
-        to_encode.update({"exp": expire, "type": "access"})
-        encoded_jwt = jwt.encode(to_encode, self.secret_key, algorithm=self.algorithm)
-        return encoded_jwt
+        return self._encode({
+            "sub": sub,
+            "username": username,
+            "role": role,
+            "email": email,
+            "exp": expire,
+            "t": TOKEN_TYPE_ACCESS
+        })
     
-    def create_refresh_token(self, data: Dict[str, Any]) -> str:
+    def create_refresh_token(self, sub: str, username: str, role: str, email: str) -> str:
         """Create JWT refresh token"""
-        to_encode = data.copy()
-        expire = datetime.now(timezone.utc) + timedelta(days=self.refresh_token_expire_days)
+        return self._encode({
+            "sub": sub,
+            "username": username,
+            "role": role,
+            "email": email,
+            "exp": int(time.time()) + self._refresh_token_ttl,
+            "t": TOKEN_TYPE_REFRESH
+        })
+    
+    @staticmethod
+    def _b64encode(data: bytes) -> bytes:
+        """Encode bytes as an unpadded base64url JWT segment"""
+        return base64.urlsafe_b64encode(data).rstrip(b"=")
+    
+    def _encode(self, claims: Dict[str, Any]) -> str:
+        """Sign claims as an HS256 token"""
+        signing_input = self._header_segment + b"." + self._b64encode(_json_dumps(claims))
+        mac = self._hmac.copy()
+        mac.update(signing_input)
+        return (signing_input + b"." + self._b64encode(mac.digest())).decode("ascii")
+    
+    @staticmethod
+    def _b64decode(segment: str) -> bytes:
+        """Decode an unpadded base64url JWT segment
+        
+        Padding and characters outside the base64url alphabet are rejected
+        rather than skipped, as urlsafe_b64decode would.
+        """
+        if len(segment) % 4 == 1 or not _SEGMENT_RE.fullmatch(segment):
+            raise jwt.DecodeError("Invalid base64 segment")
+        try:
+            return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+        except (binascii.Error, ValueError):
+            raise jwt.DecodeError("Invalid base64 segment")
+    
+    def _decode_unverified(self, token: str):
+        """Parse an HS256 token without checking its signature.
+        
+        Returns (payload, signing_input, signature). Nothing in the payload
+        can be trusted until _verify_signature has passed.
+        """
+        if not token.isascii():
+            raise jwt.DecodeError("Token must be ASCII")
+        segments = token.split(".")
+        if len(segments) != 3:
+            raise jwt.DecodeError("Token must have exactly three segments")
+        header_segment, payload_segment, signature_segment = segments
+        
+        try:
+            header = _json_loads(self._b64decode(header_segment))
+        except ValueError:
+            raise jwt.DecodeError("Invalid header")
+        if not isinstance(header, dict) or header.get("alg") != self.algorithm:
+            raise jwt.InvalidAlgorithmError("The specified alg value is not allowed")
         
-        to_encode.update({"exp": expire, "type": "refresh"})
-        encoded_jwt = jwt.encode(to_encode, self.secret_key, algorithm=self.algorithm)
-        return encoded_jwt
+        try:
+            payload = _json_loads(self._b64decode(payload_segment))
+        except ValueError:
+            raise jwt.DecodeError("Invalid payload")
+        if not isinstance(payload, dict):
+            raise jwt.DecodeError("Invalid payload")
+        
+        for claim in self._required_claims:
+            if claim not in payload:
+                raise jwt.MissingRequiredClaimError(claim)
+        if not isinstance(payload["exp"], (int, float)):
+            raise jwt.DecodeError("Expiration Time claim (exp) must be an integer.")
+        
+        signing_input = f"{header_segment}.{payload_segment}".encode("ascii")
+        return payload, signing_input, self._b64decode(signature_segment)
+    
+    def _verify_signature(self, signing_input: bytes, signature: bytes):
+        """Check an HS256 signature in constant time"""
+        mac = self._hmac.copy()
+        mac.update(signing_input)
+        if not hmac.compare_digest(mac.digest(), signature):
+            raise jwt.InvalidSignatureError("Signature verification failed")
+    
+    @staticmethod
+    def _check_claims(payload: Dict[str, Any], token_type: int):
+        """Reject tokens of the wrong type or past their expiry"""
+        if payload.get("t") != token_type:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=_DETAIL_BAD_TYPE)
+        if payload["exp"] <= time.time():
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=_DETAIL_EXPIRED)
     
-    def verify_token(self, token: str, token_type: str = "access") -> Dict[str, Any]:
+    @staticmethod
+    def _cache_key(token: str) -> bytes:
+        """Cache key for a raw token string: its full SHA-256 digest"""
+        return hashlib.sha256(token.encode("utf-8")).digest()
+    
+    def verify_token(self, token: str, token_type: int = TOKEN_TYPE_ACCESS) -> Dict[str, Any]:
         """Verify and decode JWT token"""
+        cache_key = self._cache_key(token)
+        payload = self._payload_cache.get(cache_key)
+        if payload is not None:
+            # Signature was already verified; re-check the cheap claims
+            self._check_claims(payload, token_type)
+            return payload
+        
         try:
-            payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
-            
-            # Check token type
-            if payload.get("type") != token_type:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Invalid token type"
-                )
-            
-            # Check expiration
-            exp = payload.get("exp")
-            if exp is None:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Token missing expiration"
-                )
-            
-            if datetime.now(timezone.utc) > datetime.fromtimestamp(exp, timezone.utc):
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Token expired"
-                )
+            # Claims are only read once the signature has been verified
+            payload, signing_input, signature = self._decode_unverified(token)
+            self._verify_signature(signing_input, signature)
+            self._check_claims(payload, token_type)
             
+            # Only successfully validated tokens are cached
+            self._payload_cache.set(cache_key, payload, payload["exp"])
             return payload
             
         except jwt.InvalidTokenError as e:
@@ -95,28 +328,19 @@ class JWTManager:
         role: str = payload.get("role")
         
         if user_id is None or username is None or role is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token payload"
-            )
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=_DETAIL_BAD_PAYLOAD)
         
         return {
             "user_id": user_id,
             "username": username,
-            "role": UserRole(role)
+            "role": to_role(role)
         }
     
     def create_token_pair(self, user: User) -> Dict[str, Any]:
         """Create access and refresh token pair"""
-        token_data = {
-            "sub": user.user_id,
-            "username": user.username,
-            "role": user.role.value,
-            "email": user.email
-        }
-        
-        access_token = self.create_access_token(token_data)
-        refresh_token = self.create_refresh_token(token_data)
+        claims = (user.user_id, user.username, user.role.value, user.email)
+        access_token = self.create_access_token(*claims)
+        refresh_token = self.create_refresh_token(*claims)
         
         return {
             "access_token": access_token,
@@ -128,7 +352,7 @@ class JWTManager:
                 "username": user.username,
                 "email": user.email,
                 "role": user.role.value,
-                "permissions": [p.value for p in user.permissions]
+                "permissions": list(user.permission_values)
             }
         }
 
@@ -138,56 +362,12 @@ jwt_manager = JWTManager()
 
 
 # Authentication utility functions
-def authenticate_user(username: str, password: str, user_db: Dict[str, User]) -> Optional[User]:
-    """Authenticate user with username and password"""
-    user = user_db.get(username)
-    if not user:
-        return None
-    
-    if not user.is_active:
-        return None
-    
-    if user.is_locked():
-        return None
-    
-    # In a real implementation, you'd check against hashed password from database
-    # For now, using simple password check
-    if not jwt_manager.verify_password(password, user.password_hash):  # This would come from DB
-        return None
-    
-    return user
-
-
-def get_current_user_from_token(token: str, user_db: Dict[str, User]) -> User:
-    """Get current user from JWT token"""
-    try:
-        user_data = jwt_manager.get_user_from_token(token)
-        user = user_db.get(user_data["username"])
-        
-        if not user or not user.is_active:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="User not found or inactive"
-            )
-        
-        return user
-        
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials"
-        )
-
-
 def require_permission(user: User, required_permission: str) -> bool:
     """Check if user has required permission"""
-    from auth.models import Permission
-    
-    try:
-        permission = Permission(required_permission)
-        return user.has_permission(permission)
-    except ValueError:
+    permission = PERMISSION_BY_VALUE.get(required_permission)
+    if permission is None:
         return False
+    return user.has_permission(permission)
 
 
 def require_role(user: User, required_roles: list) -> bool:
@@ -1,10 +1,14 @@
 """
 User authentication and authorization models
 """
+import calendar
+import time
 from enum import Enum
 from datetime import datetime, timezone
 from typing import Optional, List, Dict, Any
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from functools import reduce
+from operator import or_
 from pydantic import BaseModel
 
 class UserRole(Enum):
@@ -40,6 +44,25 @@ class Permission(Enum):
     VIEW_CUSTOMER_DATA = "view_customer_data"
     EDIT_CUSTOMER_DATA = "edit_customer_data"
 
+# Value -> member lookups for enums built from stored strings. Members map
+# to themselves so values already coerced by SQLEnum pass straight through.
+ROLE_BY_VALUE: Dict[Any, UserRole] = {**{r.value: r for r in UserRole}, **{r: r for r in UserRole}}
+PERMISSION_BY_VALUE: Dict[Any, Permission] = {**{p.value: p for p in Permission}, **{p: p for p in Permission}}
+
+def to_role(value) -> UserRole:
+    """Resolve a role value to its UserRole member"""
+    try:
+        return ROLE_BY_VALUE[value]
+    except KeyError:
+        raise ValueError(f"{value!r} is not a valid UserRole") from None
+
+def to_permission(value) -> Permission:
+    """Resolve a permission value to its Permission member"""
+    try:
+        return PERMISSION_BY_VALUE[value]
+    except KeyError:
+        raise ValueError(f"{value!r} is not a valid Permission") from None
+
 # Role-based permissions mapping
 ROLE_PERMISSIONS = {
     UserRole.ADMIN: [
@@ -81,7 +104,15 @@ ROLE_PERMISSIONS = {
     ]
 }
 
-@dataclass
+# Precomputed per-role lookups: bitmasks for membership checks, value tuples for payloads
+PERMISSION_BITS = {permission: 1 << i for i, permission in enumerate(Permission)}
+ROLE_PERMISSION_MASKS = {
+    role: reduce(or_, (PERMISSION_BITS[p] for p in perms), 0)
+    for role, perms in ROLE_PERMISSIONS.items()
+}
+ROLE_PERMISSION_VALUES = {role: tuple(p.value for p in perms) for role, perms in ROLE_PERMISSIONS.items()}
+
+@dataclass(slots=True)
 class User:
     """User model"""
     user_id: str
@@ -95,33 +126,59 @@ class User:
     locked_until: Optional[datetime] = None
     department: Optional[str] = None
     supervisor_id: Optional[str] = None
+    # Bitmask of the role's permissions, derived from role at construction
+    permission_mask: int = field(default=0, init=False, repr=False, compare=False)
     
     def __post_init__(self):
         if self.created_at is None:
             self.created_at = datetime.now(timezone.utc)
+        self.permission_mask = ROLE_PERMISSION_MASKS.get(self.role, 0)
+    
+    @classmethod
+    def from_db(cls, db_user) -> 'User':
+        """Build auth user from a database user row"""
+        return cls(
+            user_id=str(db_user.user_id),
+            username=db_user.username,
+            email=db_user.email,
+            role=to_role(db_user.role),
+            is_active=db_user.is_active,
+            created_at=db_user.created_at,
+            last_login=db_user.last_login_at,
+            failed_login_attempts=db_user.failed_login_attempts or 0,
+            locked_until=db_user.locked_until,
+            department=db_user.department,
+            supervisor_id=str(db_user.supervisor_id) if db_user.supervisor_id else None
+        )
     
     @property
     def permissions(self) -> List[Permission]:
         """Get user permissions based on role"""
         return ROLE_PERMISSIONS.get(self.role, [])
     
+    @property
+    def permission_values(self) -> tuple:
+        """Get user permission values based on role"""
+        return ROLE_PERMISSION_VALUES.get(self.role, ())
+    
     def has_permission(self, permission: Permission) -> bool:
         """Check if user has specific permission"""
-        return permission in self.permissions
+        return bool(self.permission_mask & PERMISSION_BITS[permission])
     
     def is_locked(self) -> bool:
         """Check if user account is locked"""
         if self.locked_until is None:
             return False
-        return datetime.now(timezone.utc) < self.locked_until
+        # Naive timestamps from the database are stored in UTC
+        return calendar.timegm(self.locked_until.utctimetuple()) > time.time()
     
     def can_access_pii(self) -> bool:
         """Check if user can access PII data"""
-        return Permission.VIEW_PII in self.permissions
+        return self.has_permission(Permission.VIEW_PII)
     
     def can_manage_users(self) -> bool:
         """Check if user can manage other users"""
-        return Permission.MANAGE_USERS in self.permissions
+        return self.has_permission(Permission.MANAGE_USERS)
 
 class UserCreate(BaseModel):
     """Model for creating new users"""
@@ -168,7 +225,23 @@ class UserResponse(BaseModel):
             created_at=user.created_at,
             last_login=user.last_login,
             department=user.department,
-            permissions=[p.value for p in user.permissions]
+            permissions=list(user.permission_values)
+        )
+    
+    @classmethod
+    def from_row(cls, row) -> 'UserResponse':
+        """Build response directly from a projected user row"""
+        role = to_role(row.role)
+        return cls(
+            user_id=str(row.user_id),
+            username=row.username,
+            email=row.email,
+            role=role,
+            is_active=row.is_active,
+            created_at=row.created_at,
+            last_login=row.last_login,
+            department=row.department,
+            permissions=list(ROLE_PERMISSION_VALUES.get(role, ()))
         )
 
 class AccessLog(BaseModel):
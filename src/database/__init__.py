@@ -1,44 +1,82 @@
 """
 Database initialization and setup
 """
+import os
+import logging
+
+from sqlalchemy import text
+
 from database.config import Base, engine, database
 from database.models import *  # Import all models
+from database.models import create_audit_log_partitions
+
+logger = logging.getLogger(__name__)
 
 
 def init_database():
     """Initialize database tables"""
-    print("Creating database tables...")
+    logger.debug("Creating database tables...")
     Base.metadata.create_all(bind=engine)
-    print("Database tables created successfully!")
+    create_audit_log_partitions(engine)
+    logger.info("Database tables created")
 
 
 def reset_database():
-    """Reset database (DROP and CREATE all tables)"""
-    print("⚠️  WARNING: This will delete all data!")
-    response = input("Are you sure you want to reset the database? (yes/NO): ")
+    """Reset database (DROP and CREATE all tables)
+    
+    Destructive, so it only runs when KYC_CONFIRM_RESET=yes is set.
+    """
+    if os.getenv("KYC_CONFIRM_RESET", "").lower() != "yes":
+        logger.warning("Database reset skipped: set KYC_CONFIRM_RESET=yes to confirm")
+        return
+    
+    logger.warning("Resetting database - all data will be deleted")
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    create_audit_log_partitions(engine)
+    logger.info("Database reset complete")
+
+
+# Tables whose rows are read per parent, and the parent-key index to order them by
+CLUSTER_INDEXES = {
+    "pii_detections": "idx_pii_document_id",
+    "authenticity_checks": "idx_authenticity_document_id",
+    "workflow_steps": "idx_workflow_session_status",
+}
+
+
+def cluster_tables():
+    """Physically reorder child tables by their parent key
+    
+    Takes an ACCESS EXCLUSIVE lock per table, so run it in a maintenance
+    window. Postgres remembers the index, so later runs only need CLUSTER.
+    Run it with ``python setup_database.py --cluster``.
+    """
+    from database import config
+    if not config.initialize_database_connection():
+        raise RuntimeError("Database is not configured")
     
-    if response.lower() == 'yes':
-        print("Dropping all tables...")
-        Base.metadata.drop_all(bind=engine)
-        print("Creating new tables...")
-        Base.metadata.create_all(bind=engine)
-        print("Database reset complete!")
-    else:
-        print("Database reset cancelled.")
+    with config.engine.begin() as conn:
+        for table, index in CLUSTER_INDEXES.items():
+            logger.info("Clustering %s using %s", table, index)
+            conn.execute(text(f"CLUSTER {table} USING {index}"))
+        for table in CLUSTER_INDEXES:
+            conn.execute(text(f"ANALYZE {table}"))
 
 
 async def startup_database():
     """Startup database connection (for FastAPI)"""
     await database.connect()
-    print("Database connected successfully!")
+    logger.info("Database connected")
 
 
 async def shutdown_database():
     """Shutdown database connection (for FastAPI)"""
     await database.disconnect()
-    print("Database disconnected.")
+    logger.info("Database disconnected")
 
 
 if __name__ == "__main__":
     # Allow running this script directly to initialize database
+    logging.basicConfig(level=logging.INFO)
     init_database()
@@ -2,14 +2,18 @@
 Database configuration and connection management
 """
 import os
-from sqlalchemy import create_engine, MetaData
+import logging
+from sqlalchemy import create_engine, MetaData, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 # from databases import Database  # Temporarily disabled for testing
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Database configuration
 DATABASE_URL = os.getenv(
     "DATABASE_URL", 
@@ -20,31 +24,54 @@ DATABASE_URL = os.getenv(
 database = None
 engine = None
 
+# Session factory, created once alongside the engine
+_SESSION_FACTORY = None
+
 def initialize_database_connection():
     """Initialize database connection when needed"""
-    global database, engine
-    if database is None:
+    global database, engine, _SESSION_FACTORY
+    if engine is None:
         try:
             # database = Database(DATABASE_URL)  # Disabled for now
-            # SQLAlchemy setup - don't test connection during creation
-            engine = create_engine(DATABASE_URL, connect_args={"connect_timeout": 5})
-            print(f"✅ Database configured: {DATABASE_URL}")
+            # SQLAlchemy setup - don't test connection during creation.
+            # Pre-ping is off: behind PgBouncer in transaction mode the extra
+            # round trip per checkout pins server connections, and a short
+            # recycle already retires connections the bouncer has dropped.
+            engine = create_engine(
+                DATABASE_URL,
+                connect_args={"connect_timeout": 5},
+                poolclass=QueuePool,
+                pool_size=int(os.getenv("DB_POOL_SIZE", "10")),
+                max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "5")),
+                pool_timeout=int(os.getenv("DB_POOL_TIMEOUT", "30")),
+                pool_pre_ping=False,
+                pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "60")),
+                executemany_mode="values_plus_batch",
+                query_cache_size=int(os.getenv("DB_QUERY_CACHE_SIZE", "1200"))
+            )
+            _SESSION_FACTORY = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+            logger.debug("Database configured: %s", engine.url)
             return True
         except Exception as e:
-            print(f"⚠️  Database configuration warning: {e}")
+            logger.warning("Database configuration warning: %s", e)
             database = None
             engine = None
+            _SESSION_FACTORY = None
             return False
     return True
+
 def get_session_local():
     """Get SessionLocal, initializing connection if needed"""
-    initialize_database_connection()
-    if engine:
-        return sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    return None
+    if _SESSION_FACTORY is None:
+        initialize_database_connection()
+    return _SESSION_FACTORY
 
-# For backwards compatibility
-SessionLocal = get_session_local
+def SessionLocal():
+    """Open a new session from the shared factory"""
+    factory = get_session_local()
+    if factory is None:
+        return None
+    return factory()
 
 # Base class for models
 Base = declarative_base()
@@ -70,28 +97,42 @@ def get_db():
         finally:
             db.close()
     else:
-        print("⚠️  No database session available")
+        logger.warning("No database session available")
         yield None
 
+def check_database_health():
+    """Run a trivial query on its own short-lived transaction"""
+    if not initialize_database_connection() or engine is None:
+        return False
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        return True
+    except Exception as e:
+        logger.warning("Database health check failed: %s", e)
+        return False
+
 def create_tables():
     """Create all database tables"""
     initialize_database_connection()
     if engine:
+        from database.models import create_audit_log_partitions
         Base.metadata.create_all(bind=engine)
+        create_audit_log_partitions(engine)
     else:
-        print("⚠️  No database engine available")
+        logger.warning("No database engine available")
 
 def drop_tables():
     """Drop all database tables (use with caution!)"""
     if engine:
         Base.metadata.drop_all(bind=engine)
     else:
-        print("⚠️  No database engine available")
+        logger.warning("No database engine available")
 
 def init_database():
     """Initialize database and create tables"""
     if not initialize_database_connection():
-        print("⚠️  Database not configured - skipping initialization")
+        logger.warning("Database not configured - skipping initialization")
         return
         
     try:
@@ -113,11 +154,16 @@ def init_database():
             # Check if admin exists
             admin = user_repo.get_user_by_username("admin")
             if not admin:
+                # Prefer an operator-supplied hash so boot skips the password hashing work
+                admin_password_hash = os.getenv("ADMIN_PASSWORD_HASH") or jwt_manager.hash_password(
+                    os.getenv("ADMIN_PASSWORD", "admin123")  # Change in production!
+                )
+                
                 # Create default admin
                 admin_data = {
                     "username": "admin",
                     "email": "admin@kyc-analyzer.com",
-                    "password_hash": jwt_manager.hash_password("admin123"),  # Change in production!
+                    "password_hash": admin_password_hash,
                     "first_name": "System",
                     "last_name": "Administrator",
                     "role": UserRole.ADMIN.value,
@@ -127,11 +173,11 @@ def init_database():
                 }
                 
                 user_repo.create_user(admin_data)
-                print("✅ Default admin user created (username: admin, password: admin123)")
+                logger.info("Default admin user created (username: admin)")
             
         finally:
             db.close()
             
     except Exception as e:
-        print(f"⚠️  Database initialization warning: {e}")
-        print("💡 You may need to run the database setup script manually")
+        logger.warning("Database initialization warning: %s - you may need to run "
+                       "the database setup script manually", e)
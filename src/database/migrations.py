@@ -0,0 +1,484 @@
+"""
+Schema migrations for existing databases
+
+create_all only creates missing tables, so a database created by an earlier
+release keeps its old column types, keys and indexes. Each schema change
+registers an upgrade step here, and migrate_schema applies the steps a
+database still needs, in order, in a single transaction.
+
+A step checks the catalog for the old shape instead of a stored version, so a
+database created after a change simply skips that step. Steps use SQL frozen
+at the time of the change, not the models, which keep moving.
+"""
+import logging
+from datetime import datetime, timezone
+from typing import Callable, List, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+logger = logging.getLogger(__name__)
+
+# (name, pending check, upgrade) in the order the changes were made
+MIGRATIONS: List[Tuple[str, Callable[[Connection], bool], Callable[[Connection], None]]] = []
+
+
+def migration(name: str, pending: Callable[[Connection], bool]):
+    """Register the decorated function as an upgrade step, run when ``pending`` holds"""
+    def register(upgrade):
+        MIGRATIONS.append((name, pending, upgrade))
+        return upgrade
+    return register
+
+
+def _execute(conn, *statements: str):
+    for statement in statements:
+        conn.execute(text(statement))
+
+
+def _column(conn, table: str, column: str):
+    """information_schema row for a column, or None when it does not exist"""
+    return conn.execute(text(
+        "SELECT udt_name, column_default, is_identity, is_generated FROM information_schema.columns "
+        "WHERE table_schema = current_schema() AND table_name = :table AND column_name = :column"
+    ), {"table": table, "column": column}).first()
+
+
+def _has_index(conn, name: str) -> bool:
+    return conn.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}).scalar()
+
+
+def _is_partitioned(conn, table: str) -> bool:
+    return conn.execute(
+        text("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(:table)"), {"table": table}
+    ).scalar()
+
+
+def _constraint(conn, name: str):
+    """pg_constraint row (contype, confdeltype) for a constraint, or None when it does not exist"""
+    return conn.execute(
+        text("SELECT contype, confdeltype FROM pg_constraint WHERE conname = :name"), {"name": name}
+    ).first()
+
+
+# Child tables whose UUID keys became BIGINT: (table, key column)
+_BIGINT_KEYS = [
+    ("pii_detections", "detection_id"),
+    ("authenticity_checks", "check_id"),
+    ("risk_assessments", "assessment_id"),
+    ("workflow_steps", "step_id"),
+    ("audit_logs", "log_id"),
+]
+
+
+@migration("bigint_child_keys", lambda conn: _column(conn, "pii_detections", "detection_id").udt_name == "uuid")
+def _bigint_child_keys(conn):
+    """Number child rows with BIGSERIAL keys and keep the old UUIDs in legacy_<key>
+
+    No foreign key points at these tables, so existing rows are simply
+    numbered in physical order.
+    """
+    for table, key in _BIGINT_KEYS:
+        _execute(
+            conn,
+            f"ALTER TABLE {table} DROP CONSTRAINT {table}_pkey",
+            f"ALTER TABLE {table} RENAME COLUMN {key} TO legacy_{key}",
+            f"ALTER TABLE {table} ALTER COLUMN legacy_{key} DROP NOT NULL",
+            f"ALTER TABLE {table} ADD COLUMN {key} BIGSERIAL PRIMARY KEY",
+        )
+
+
+@migration("status_composite_indexes", lambda conn: not _has_index(conn, "idx_document_customer_status"))
+def _status_composite_indexes(conn):
+    _execute(
+        conn,
+        "CREATE INDEX idx_document_customer_status ON documents (customer_id, status)",
+        "CREATE INDEX idx_session_customer_status ON kyc_sessions (customer_id, status)",
+        "CREATE INDEX idx_workflow_session_status ON workflow_steps (session_id, status)",
+    )
+
+
+_JSONB_COLUMNS = [
+    ("documents", "analysis_results"),
+    ("kyc_sessions", "required_documents"),
+    ("kyc_sessions", "submitted_documents"),
+    ("authenticity_checks", "fraud_indicators"),
+    ("authenticity_checks", "check_details"),
+    ("authenticity_checks", "risk_factors"),
+    ("risk_assessments", "risk_factors"),
+    ("risk_assessments", "mitigating_factors"),
+    ("workflow_steps", "input_data"),
+    ("workflow_steps", "output_data"),
+    ("audit_logs", "event_data"),
+    ("audit_logs", "old_values"),
+    ("audit_logs", "new_values"),
+]
+
+
+@migration("jsonb_columns", lambda conn: _column(conn, "documents", "analysis_results").udt_name == "json")
+def _jsonb_columns(conn):
+    for table, column in _JSONB_COLUMNS:
+        conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE JSONB USING {column}::jsonb"))
+    _execute(
+        conn,
+        "CREATE INDEX idx_authenticity_fraud_indicators_gin ON authenticity_checks USING gin (fraud_indicators)",
+        "CREATE INDEX idx_risk_factors_gin ON risk_assessments USING gin (risk_factors)",
+        "CREATE INDEX idx_audit_event_data_gin ON audit_logs USING gin (event_data)",
+    )
+
+
+_AUDIT_LOG_COLUMNS = (
+    "log_id, action, resource_type, resource_id, user_id, username, ip_address, user_agent, "
+    "request_id, event_data, old_values, new_values, status, error_message, timestamp"
+)
+
+
+def _create_audit_log_partition(conn, year: int, month: int):
+    next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+    conn.execute(text(
+        f"CREATE TABLE audit_logs_{year:04d}_{month:02d} PARTITION OF audit_logs "
+        f"FOR VALUES FROM ('{year:04d}-{month:02d}-01') TO ('{next_year:04d}-{next_month:02d}-01')"
+    ))
+
+
+@migration("partition_audit_logs", lambda conn: not _is_partitioned(conn, "audit_logs"))
+def _partition_audit_logs(conn):
+    """Copy audit_logs into a table range-partitioned by month on timestamp
+
+    Rows keep their log_id. Every month that has rows gets a partition, as do
+    the current and the next month.
+    """
+    _execute(
+        conn,
+        "ALTER TABLE audit_logs RENAME TO audit_logs_unpartitioned",
+        "ALTER TABLE audit_logs_unpartitioned RENAME CONSTRAINT audit_logs_pkey TO audit_logs_unpartitioned_pkey",
+        "ALTER TABLE audit_logs_unpartitioned RENAME CONSTRAINT audit_logs_user_id_fkey "
+        "TO audit_logs_unpartitioned_user_id_fkey",
+        "ALTER SEQUENCE audit_logs_log_id_seq RENAME TO audit_logs_unpartitioned_log_id_seq",
+        "DROP INDEX IF EXISTS ix_audit_logs_action, ix_audit_logs_timestamp, idx_audit_action_timestamp, "
+        "idx_audit_user_timestamp, idx_audit_resource, idx_audit_event_data_gin",
+        "CREATE TABLE audit_logs ("
+        " log_id BIGSERIAL NOT NULL,"
+        " action VARCHAR(100) NOT NULL,"
+        " resource_type VARCHAR(100),"
+        " resource_id VARCHAR(255),"
+        " user_id UUID REFERENCES users (user_id),"
+        " username VARCHAR(100),"
+        " ip_address VARCHAR(45),"
+        " user_agent VARCHAR(500),"
+        " request_id VARCHAR(100),"
+        " event_data JSONB,"
+        " old_values JSONB,"
+        " new_values JSONB,"
+        " status VARCHAR(50) NOT NULL,"
+        " error_message TEXT,"
+        " timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,"
+        " PRIMARY KEY (log_id, timestamp)"
+        ") PARTITION BY RANGE (timestamp)",
+        "CREATE TABLE audit_logs_default PARTITION OF audit_logs DEFAULT",
+    )
+
+    now = datetime.now(timezone.utc)
+    next_month = (now.year + 1, 1) if now.month == 12 else (now.year, now.month + 1)
+    months = {(now.year, now.month), next_month}
+    months.update(conn.execute(text(
+        "SELECT DISTINCT CAST(EXTRACT(year FROM timestamp) AS INTEGER), CAST(EXTRACT(month FROM timestamp) AS INTEGER) "
+        "FROM audit_logs_unpartitioned"
+    )).all())
+    for year, month in sorted(months):
+        _create_audit_log_partition(conn, year, month)
+
+    columns = _AUDIT_LOG_COLUMNS
+    if _column(conn, "audit_logs_unpartitioned", "legacy_log_id") is not None:
+        conn.execute(text("ALTER TABLE audit_logs ADD COLUMN legacy_log_id UUID"))
+        columns += ", legacy_log_id"
+    _execute(
+        conn,
+        f"INSERT INTO audit_logs ({columns}) SELECT {columns} FROM audit_logs_unpartitioned",
+        "SELECT setval('audit_logs_log_id_seq', COALESCE((SELECT MAX(log_id) FROM audit_logs), 0) + 1, false)",
+        "DROP TABLE audit_logs_unpartitioned",
+        "CREATE INDEX ix_audit_logs_action ON audit_logs (action)",
+        "CREATE INDEX ix_audit_logs_timestamp ON audit_logs (timestamp)",
+        "CREATE INDEX idx_audit_action_timestamp ON audit_logs (action, timestamp)",
+        "CREATE INDEX idx_audit_user_timestamp ON audit_logs (user_id, timestamp)",
+        "CREATE INDEX idx_audit_resource ON audit_logs (resource_type, resource_id)",
+        "CREATE INDEX idx_audit_event_data_gin ON audit_logs USING gin (event_data)",
+    )
+
+
+# Single-column indexes that lead a composite index
+_REDUNDANT_INDEXES = [
+    "ix_customers_email",
+    "ix_documents_file_hash",
+    "idx_document_customer_id",
+    "idx_session_customer_id",
+    "idx_session_status",
+    "ix_audit_logs_action",
+]
+
+
+@migration("drop_redundant_indexes", lambda conn: any(_has_index(conn, name) for name in _REDUNDANT_INDEXES))
+def _drop_redundant_indexes(conn):
+    for name in _REDUNDANT_INDEXES:
+        conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+
+@migration("binary_file_hash", lambda conn: _column(conn, "documents", "file_hash").udt_name == "varchar")
+def _binary_file_hash(conn):
+    """Store the hex SHA-256 strings as raw 32-byte digests"""
+    conn.execute(text("ALTER TABLE documents ALTER COLUMN file_hash TYPE BYTEA USING decode(file_hash, 'hex')"))
+
+
+# Native enum columns: (table, column, enum type). The labels were created in
+# declaration order, which is also the order the SMALLINT codes follow.
+_ENUM_COLUMNS = [
+    ("customers", "kyc_status", "kycstatus"),
+    ("customers", "customer_status", "customerstatus"),
+    ("customers", "risk_level", "risklevel"),
+    ("documents", "document_type", "documenttype"),
+    ("documents", "status", "documentstatus"),
+    ("kyc_sessions", "status", "kycstatus"),
+    ("users", "role", "userrole"),
+    ("pii_detections", "risk_level", "risklevel"),
+    ("risk_assessments", "risk_level", "risklevel"),
+]
+
+
+@migration("smallint_enum_codes", lambda conn: _column(conn, "customers", "kyc_status").udt_name != "int2")
+def _smallint_enum_codes(conn):
+    for table, column, enum_type in _ENUM_COLUMNS:
+        conn.execute(text(
+            f"ALTER TABLE {table} ALTER COLUMN {column} TYPE SMALLINT "
+            f"USING array_position(enum_range(NULL::{enum_type}), {column}) - 1"
+        ))
+    for enum_type in sorted({enum_type for _, _, enum_type in _ENUM_COLUMNS}):
+        conn.execute(text(f"DROP TYPE {enum_type}"))
+
+
+_SERVER_TIMESTAMPS = [
+    ("customers", "created_at"),
+    ("customers", "updated_at"),
+    ("documents", "uploaded_at"),
+    ("documents", "updated_at"),
+    ("kyc_sessions", "created_at"),
+    ("kyc_sessions", "updated_at"),
+    ("users", "created_at"),
+    ("users", "updated_at"),
+    ("pii_detections", "detected_at"),
+    ("authenticity_checks", "checked_at"),
+    ("risk_assessments", "assessed_at"),
+    ("workflow_steps", "created_at"),
+    ("audit_logs", "timestamp"),
+]
+
+
+@migration("server_timestamps", lambda conn: _column(conn, "customers", "created_at").column_default is None)
+def _server_timestamps(conn):
+    for table, column in _SERVER_TIMESTAMPS:
+        conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN {column} SET DEFAULT timezone('UTC', now())"))
+
+
+@migration("partial_indexes", lambda conn: not _has_index(conn, "idx_document_processing"))
+def _partial_indexes(conn):
+    _execute(
+        conn,
+        # DocumentStatus.UPLOADED and DocumentStatus.PROCESSING
+        "CREATE INDEX idx_document_processing ON documents (uploaded_at) WHERE status IN (0, 1)",
+        "CREATE INDEX idx_workflow_pending ON workflow_steps (session_id) WHERE is_completed IS false",
+        "CREATE INDEX idx_audit_errors ON audit_logs (timestamp) WHERE status = 'error'",
+    )
+
+
+@migration("audit_lookup_tables", lambda conn: _column(conn, "audit_logs", "ip_address") is not None)
+def _audit_lookup_tables(conn):
+    """Move audit IP addresses and user agents into deduplicated lookup tables
+
+    The app's create_all may already have created the empty lookup tables, in
+    whatever shape the running release declares.
+    """
+    _execute(
+        conn,
+        "CREATE TABLE IF NOT EXISTS ip_addresses ("
+        " ip_address_id SERIAL PRIMARY KEY, address VARCHAR(45) NOT NULL UNIQUE)",
+        "CREATE TABLE IF NOT EXISTS user_agents ("
+        " user_agent_id SERIAL PRIMARY KEY, user_agent VARCHAR(500) NOT NULL UNIQUE)",
+    )
+    address_type = _column(conn, "ip_addresses", "address").udt_name
+    _execute(
+        conn,
+        f"INSERT INTO ip_addresses (address) SELECT DISTINCT CAST(ip_address AS {address_type}) "
+        "FROM audit_logs WHERE ip_address IS NOT NULL ON CONFLICT DO NOTHING",
+        "INSERT INTO user_agents (user_agent) SELECT DISTINCT user_agent "
+        "FROM audit_logs WHERE user_agent IS NOT NULL ON CONFLICT DO NOTHING",
+        "ALTER TABLE audit_logs"
+        " ADD COLUMN ip_address_id INTEGER REFERENCES ip_addresses (ip_address_id),"
+        " ADD COLUMN user_agent_id INTEGER REFERENCES user_agents (user_agent_id)",
+        f"UPDATE audit_logs a SET ip_address_id = i.ip_address_id FROM ip_addresses i "
+        f"WHERE i.address = CAST(a.ip_address AS {address_type})",
+        "UPDATE audit_logs a SET user_agent_id = u.user_agent_id FROM user_agents u "
+        "WHERE u.user_agent = a.user_agent",
+        "ALTER TABLE audit_logs DROP COLUMN ip_address, DROP COLUMN user_agent",
+    )
+
+
+@migration("inet_addresses", lambda conn: _column(conn, "ip_addresses", "address").udt_name == "varchar")
+def _inet_addresses(conn):
+    conn.execute(text("ALTER TABLE ip_addresses ALTER COLUMN address TYPE INET USING address::inet"))
+
+
+_IDENTITY_KEYS = [
+    ("pii_detections", "detection_id"),
+    ("authenticity_checks", "check_id"),
+    ("risk_assessments", "assessment_id"),
+    ("workflow_steps", "step_id"),
+    ("ip_addresses", "ip_address_id"),
+    ("user_agents", "user_agent_id"),
+]
+
+
+@migration("identity_keys", lambda conn: _column(conn, "pii_detections", "detection_id").is_identity == "NO")
+def _identity_keys(conn):
+    """Swap the serial sequences for GENERATED ALWAYS identities that continue the numbering"""
+    for table, key in _IDENTITY_KEYS:
+        if _column(conn, table, key).is_identity == "YES":
+            continue
+        sequence = conn.execute(text("SELECT pg_get_serial_sequence(:table, :key)"),
+                                {"table": table, "key": key}).scalar()
+        _execute(
+            conn,
+            f"ALTER TABLE {table} ALTER COLUMN {key} DROP DEFAULT",
+            f"DROP SEQUENCE {sequence}",
+            f"ALTER TABLE {table} ALTER COLUMN {key} ADD GENERATED ALWAYS AS IDENTITY",
+            f"SELECT setval(pg_get_serial_sequence('{table}', '{key}'), "
+            f"COALESCE((SELECT MAX({key}) FROM {table}), 0) + 1, false)",
+        )
+
+
+@migration("child_document_indexes", lambda conn: not _has_index(conn, "idx_pii_document_id"))
+def _child_document_indexes(conn):
+    _execute(
+        conn,
+        "CREATE INDEX idx_pii_document_id ON pii_detections (document_id)",
+        "CREATE INDEX idx_authenticity_document_id ON authenticity_checks (document_id)",
+    )
+
+
+@migration("foreign_key_indexes", lambda conn: not _has_index(conn, "idx_user_supervisor"))
+def _foreign_key_indexes(conn):
+    _execute(
+        conn,
+        "CREATE INDEX idx_user_supervisor ON users (supervisor_id)",
+        "CREATE INDEX idx_risk_customer ON risk_assessments (customer_id)",
+    )
+
+
+# (table, column, parent table, parent column, ON DELETE action)
+_CASCADING_FOREIGN_KEYS = [
+    ("documents", "customer_id", "customers", "customer_id", "CASCADE"),
+    ("kyc_sessions", "customer_id", "customers", "customer_id", "CASCADE"),
+    ("pii_detections", "document_id", "documents", "document_id", "CASCADE"),
+    ("authenticity_checks", "document_id", "documents", "document_id", "CASCADE"),
+    ("risk_assessments", "customer_id", "customers", "customer_id", "CASCADE"),
+    ("workflow_steps", "session_id", "kyc_sessions", "session_id", "CASCADE"),
+    ("audit_logs", "user_id", "users", "user_id", "SET NULL"),
+]
+
+
+@migration("cascade_deletes", lambda conn: _constraint(conn, "documents_customer_id_fkey").confdeltype == "a")
+def _cascade_deletes(conn):
+    for table, column, parent, parent_column, action in _CASCADING_FOREIGN_KEYS:
+        conn.execute(text(
+            f"ALTER TABLE {table} DROP CONSTRAINT {table}_{column}_fkey, "
+            f"ADD CONSTRAINT {table}_{column}_fkey FOREIGN KEY ({column}) "
+            f"REFERENCES {parent} ({parent_column}) ON DELETE {action}"
+        ))
+
+
+@migration("brin_uploaded_at", lambda conn: not _has_index(conn, "idx_document_uploaded_at_brin"))
+def _brin_uploaded_at(conn):
+    _execute(
+        conn,
+        "CREATE INDEX idx_document_uploaded_at_brin ON documents USING brin (uploaded_at) WITH (pages_per_range = 32)",
+        "DROP INDEX IF EXISTS idx_document_uploaded_at",
+    )
+
+
+@migration("customer_full_name", lambda conn: _column(conn, "customers", "full_name") is None)
+def _customer_full_name(conn):
+    _execute(
+        conn,
+        "ALTER TABLE customers ADD COLUMN full_name VARCHAR(201) "
+        "GENERATED ALWAYS AS (first_name || ' ' || last_name) STORED",
+        "CREATE INDEX idx_customer_email_lower ON customers (lower(email))",
+    )
+
+
+@migration("derived_step_completion",
+           lambda conn: _column(conn, "workflow_steps", "is_completed").is_generated == "NEVER")
+def _derived_step_completion(conn):
+    """Recompute is_completed from status; dropping the column also drops idx_workflow_pending"""
+    _execute(
+        conn,
+        "ALTER TABLE workflow_steps DROP COLUMN is_completed",
+        "ALTER TABLE workflow_steps ADD COLUMN is_completed BOOLEAN GENERATED ALWAYS AS (status = 'completed') STORED",
+        "CREATE INDEX idx_workflow_pending ON workflow_steps (session_id) WHERE is_completed IS false",
+    )
+
+
+@migration("redaction_check", lambda conn: _constraint(conn, "ck_document_redaction_requires_detection") is None)
+def _redaction_check(conn):
+    """Add the redaction CHECK after repairing rows it would reject; a redacted document was detected"""
+    _execute(
+        conn,
+        "UPDATE documents SET pii_detected = TRUE WHERE pii_redacted AND NOT pii_detected",
+        "ALTER TABLE documents ADD CONSTRAINT ck_document_redaction_requires_detection "
+        "CHECK (pii_detected OR NOT pii_redacted)",
+    )
+
+
+@migration("status_created_indexes", lambda conn: not _has_index(conn, "idx_customer_kyc_status_created"))
+def _status_created_indexes(conn):
+    _execute(
+        conn,
+        "CREATE INDEX idx_customer_kyc_status_created ON customers (kyc_status, created_at)",
+        "CREATE INDEX idx_customer_risk_level_created ON customers (risk_level, created_at)",
+        "DROP INDEX IF EXISTS idx_customer_kyc_status, idx_customer_risk_level",
+    )
+
+
+@migration("trigram_search_indexes", lambda conn: not _has_index(conn, "idx_customer_full_name_trgm"))
+def _trigram_search_indexes(conn):
+    _execute(
+        conn,
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE INDEX idx_customer_full_name_trgm ON customers USING gin (full_name gin_trgm_ops)",
+        "CREATE INDEX idx_customer_email_trgm ON customers USING gin (email gin_trgm_ops)",
+        "CREATE INDEX idx_customer_phone_trgm ON customers USING gin (phone_number gin_trgm_ops)",
+    )
+
+
+def migrate_schema(engine) -> bool:
+    """Apply every upgrade step the database still needs
+
+    Returns False when there is nothing to do (no tables yet, or already
+    current). Everything runs in one transaction, so a failure leaves the
+    database untouched. Back up first and stop the application while it runs:
+    the table rewrites hold ACCESS EXCLUSIVE locks.
+    """
+    with engine.begin() as conn:
+        if not inspect(conn).has_table("customers"):
+            logger.info("No existing tables; create_all builds the current schema")
+            return False
+
+        applied = []
+        for name, pending, upgrade in MIGRATIONS:
+            if pending(conn):
+                logger.info("Applying schema migration %s", name)
+                upgrade(conn)
+                applied.append(name)
+
+    if applied:
+        logger.info("Database schema migrated: %s", ", ".join(applied))
+    else:
+        logger.info("Schema is already up to date")
+    return bool(applied)
@@ -2,12 +2,15 @@
 Database models for KYC Document Analyzer
 """
 from sqlalchemy import (
-    Column, String, Integer, DateTime, Boolean, Text, Float, 
-    ForeignKey, Enum as SQLEnum, JSON, LargeBinary, Index
+    Column, String, Integer, BigInteger, DateTime, Boolean, Text, Float, Computed, CheckConstraint,
+    SmallInteger, ForeignKey, LargeBinary, Identity, Index, DDL, event, func, text
 )
-from sqlalchemy.orm import relationship
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.types import TypeDecorator
+from sqlalchemy.orm import relationship, deferred
+from sqlalchemy.dialects.postgresql import UUID, JSONB, INET
 from datetime import datetime, timezone
+import os
+import time
 import uuid
 import enum
 
@@ -16,6 +19,56 @@ from models.kyc_models import DocumentType, DocumentStatus, KYCStatus
 from auth.models import UserRole
 
 
+def uuid7() -> uuid.UUID:
+    """Generate a time-ordered UUIDv7 (RFC 9562) for primary keys.
+
+    The leading 48 bits are a Unix millisecond timestamp, so new rows append
+    to the right-hand edge of the primary key index instead of landing on a
+    random page like uuid4 values do.
+    """
+    value = (time.time_ns() // 1_000_000) << 80
+    value |= int.from_bytes(os.urandom(10), "big")
+    value = (value & ~(0xF << 76)) | (0x7 << 76)
+    value = (value & ~(0x3 << 62)) | (0x2 << 62)
+    return uuid.UUID(int=value)
+
+
+def utc_now():
+    """Database-side UTC timestamp for the naive DateTime columns"""
+    return func.timezone('UTC', func.now())
+
+
+class IntEnum(TypeDecorator):
+    """Store a Python enum as a SMALLINT code instead of a native Postgres enum
+
+    Codes follow declaration order, so new members must be appended to the
+    end of the enum class, never inserted or reordered.
+    """
+    impl = SmallInteger
+    cache_ok = True
+
+    def __init__(self, enum_class, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.enum_class = enum_class
+        self._to_int = {member: code for code, member in enumerate(enum_class)}
+        self._from_int = tuple(enum_class)
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if not isinstance(value, self.enum_class):
+            try:
+                value = self.enum_class(value)
+            except ValueError:
+                value = self.enum_class[value]
+        return self._to_int[value]
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return self._from_int[value]
+
+
 class CustomerStatus(enum.Enum):
     """Customer status in KYC process"""
     REGISTERED = "registered"
@@ -51,20 +104,23 @@ class WorkflowStatus(enum.Enum):
 class Customer(Base):
     """Customer information"""
     __tablename__ = "customers"
+    # Fetch server-generated timestamps via RETURNING on INSERT and UPDATE
+    __mapper_args__ = {"eager_defaults": True}
 
-    customer_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    customer_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     external_customer_id = Column(String(100), unique=True, nullable=True, index=True)
     
     # Personal Information
     first_name = Column(String(100), nullable=False)
     last_name = Column(String(100), nullable=False)
     middle_name = Column(String(100), nullable=True)
+    full_name = Column(String(201), Computed("first_name || ' ' || last_name", persisted=True))
     date_of_birth = Column(DateTime, nullable=True)
     nationality = Column(String(50), nullable=True)
     gender = Column(String(10), nullable=True)
     
     # Contact Information
-    email = Column(String(255), nullable=False, index=True)
+    email = Column(String(255), nullable=False)
     phone_number = Column(String(20), nullable=True)
     address_line1 = Column(String(255), nullable=True)
     address_line2 = Column(String(255), nullable=True)
@@ -74,14 +130,14 @@ class Customer(Base):
     country = Column(String(100), nullable=True)
     
     # KYC Information
-    kyc_status = Column(SQLEnum(KYCStatus), default=KYCStatus.PENDING, nullable=False)
-    customer_status = Column(SQLEnum(CustomerStatus), default=CustomerStatus.REGISTERED, nullable=False)
-    risk_level = Column(SQLEnum(RiskLevel), default=RiskLevel.MEDIUM, nullable=False)
+    kyc_status = Column(IntEnum(KYCStatus), default=KYCStatus.PENDING, nullable=False)
+    customer_status = Column(IntEnum(CustomerStatus), default=CustomerStatus.REGISTERED, nullable=False)
+    risk_level = Column(IntEnum(RiskLevel), default=RiskLevel.MEDIUM, nullable=False)
     risk_score = Column(Float, default=0.0, nullable=False)
     
     # Timestamps
-    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
-    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc), nullable=False)
+    created_at = Column(DateTime, server_default=utc_now(), nullable=False)
+    updated_at = Column(DateTime, server_default=utc_now(), onupdate=utc_now(), nullable=False)
     kyc_completed_at = Column(DateTime, nullable=True)
     last_reviewed_at = Column(DateTime, nullable=True)
     
@@ -91,15 +147,24 @@ class Customer(Base):
     notes = Column(Text, nullable=True)
     
     # Relationships
-    documents = relationship("Document", back_populates="customer", cascade="all, delete-orphan")
-    kyc_sessions = relationship("KYCSession", back_populates="customer", cascade="all, delete-orphan")
-    risk_assessments = relationship("RiskAssessment", back_populates="customer", cascade="all, delete-orphan")
+    documents = relationship("Document", back_populates="customer", cascade="all, delete-orphan", passive_deletes=True)
+    kyc_sessions = relationship("KYCSession", back_populates="customer", cascade="all, delete-orphan",
+                                passive_deletes=True)
+    risk_assessments = relationship("RiskAssessment", back_populates="customer", cascade="all, delete-orphan",
+                                    passive_deletes=True)
     
     # Indexes
     __table_args__ = (
         Index('idx_customer_email_status', 'email', 'customer_status'),
-        Index('idx_customer_kyc_status', 'kyc_status'),
-        Index('idx_customer_risk_level', 'risk_level'),
+        Index('idx_customer_email_lower', func.lower(email)),
+        # Trigram indexes let ILIKE '%term%' searches use an index (needs pg_trgm)
+        Index('idx_customer_full_name_trgm', 'full_name', postgresql_using='gin',
+              postgresql_ops={'full_name': 'gin_trgm_ops'}),
+        Index('idx_customer_email_trgm', 'email', postgresql_using='gin', postgresql_ops={'email': 'gin_trgm_ops'}),
+        Index('idx_customer_phone_trgm', 'phone_number', postgresql_using='gin',
+              postgresql_ops={'phone_number': 'gin_trgm_ops'}),
+        Index('idx_customer_kyc_status_created', 'kyc_status', 'created_at'),
+        Index('idx_customer_risk_level_created', 'risk_level', 'created_at'),
         Index('idx_customer_created_at', 'created_at'),
     )
 
@@ -108,16 +173,18 @@ class Customer(Base):
 class Document(Base):
     """Document information"""
     __tablename__ = "documents"
+    # Fetch server-generated timestamps via RETURNING on INSERT and UPDATE
+    __mapper_args__ = {"eager_defaults": True}
 
-    document_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    customer_id = Column(UUID(as_uuid=True), ForeignKey("customers.customer_id"), nullable=False)
+    document_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
+    customer_id = Column(UUID(as_uuid=True), ForeignKey("customers.customer_id", ondelete="CASCADE"), nullable=False)
     
     # Document Information
-    document_type = Column(SQLEnum(DocumentType), nullable=False)
+    document_type = Column(IntEnum(DocumentType), nullable=False)
     original_filename = Column(String(255), nullable=False)
     file_size = Column(Integer, nullable=False)
     mime_type = Column(String(100), nullable=False)
-    file_hash = Column(String(64), nullable=False, index=True)  # SHA-256 hash
+    file_hash = Column(LargeBinary(32), nullable=False)  # Raw SHA-256 digest
     
     # Storage Information
     blob_name = Column(String(255), nullable=False)
@@ -125,40 +192,46 @@ class Document(Base):
     blob_url = Column(String(500), nullable=False)
     
     # Processing Information
-    status = Column(SQLEnum(DocumentStatus), default=DocumentStatus.UPLOADED, nullable=False)
+    status = Column(IntEnum(DocumentStatus), default=DocumentStatus.UPLOADED, nullable=False)
     processing_started_at = Column(DateTime, nullable=True)
     processing_completed_at = Column(DateTime, nullable=True)
-    processing_error = Column(Text, nullable=True)
+    processing_error = deferred(Column(Text, nullable=True), group="document_content")
     
     # Analysis Results
-    extracted_text = Column(Text, nullable=True)
+    extracted_text = deferred(Column(Text, nullable=True), group="document_content")
     confidence_score = Column(Float, nullable=True)
-    analysis_results = Column(JSON, nullable=True)
+    analysis_results = deferred(Column(JSONB, nullable=True), group="document_content")
     pii_detected = Column(Boolean, default=False, nullable=False)
     pii_redacted = Column(Boolean, default=False, nullable=False)
     authenticity_score = Column(Float, nullable=True)
     authenticity_status = Column(String(50), nullable=True)
     
     # Timestamps
-    uploaded_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
-    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc), nullable=False)
+    uploaded_at = Column(DateTime, server_default=utc_now(), nullable=False)
+    updated_at = Column(DateTime, server_default=utc_now(), onupdate=utc_now(), nullable=False)
     
     # Metadata
     upload_source = Column(String(100), nullable=True)
     uploaded_by_user_id = Column(UUID(as_uuid=True), nullable=True)
-    notes = Column(Text, nullable=True)
+    notes = deferred(Column(Text, nullable=True), group="document_content")
     
     # Relationships
     customer = relationship("Customer", back_populates="documents")
-    pii_detections = relationship("PIIDetection", back_populates="document", cascade="all, delete-orphan")
-    authenticity_checks = relationship("AuthenticityCheck", back_populates="document", cascade="all, delete-orphan")
+    pii_detections = relationship("PIIDetection", back_populates="document", cascade="all, delete-orphan",
+                                  passive_deletes=True)
+    authenticity_checks = relationship("AuthenticityCheck", back_populates="document", cascade="all, delete-orphan",
+                                       passive_deletes=True)
     
     # Indexes
     __table_args__ = (
-        Index('idx_document_customer_id', 'customer_id'),
+        Index('idx_document_customer_status', 'customer_id', 'status'),
         Index('idx_document_type_status', 'document_type', 'status'),
         Index('idx_document_hash', 'file_hash'),
-        Index('idx_document_uploaded_at', 'uploaded_at'),
+        Index('idx_document_uploaded_at_brin', 'uploaded_at', postgresql_using='brin',
+              postgresql_with={'pages_per_range': 32}),
+        CheckConstraint('pii_detected OR NOT pii_redacted', name='ck_document_redaction_requires_detection'),
+        Index('idx_document_processing', 'uploaded_at',
+              postgresql_where=status.in_([DocumentStatus.UPLOADED, DocumentStatus.PROCESSING])),
     )
 
 
@@ -166,20 +239,22 @@ class Document(Base):
 class KYCSession(Base):
     """KYC processing session"""
     __tablename__ = "kyc_sessions"
+    # Fetch server-generated timestamps via RETURNING on INSERT and UPDATE
+    __mapper_args__ = {"eager_defaults": True}
 
-    session_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    customer_id = Column(UUID(as_uuid=True), ForeignKey("customers.customer_id"), nullable=False)
+    session_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
+    customer_id = Column(UUID(as_uuid=True), ForeignKey("customers.customer_id", ondelete="CASCADE"), nullable=False)
     
     # Session Information
-    status = Column(SQLEnum(KYCStatus), default=KYCStatus.PENDING, nullable=False)
+    status = Column(IntEnum(KYCStatus), default=KYCStatus.PENDING, nullable=False)
     session_type = Column(String(50), default="full_kyc", nullable=False)
     priority = Column(String(20), default="normal", nullable=False)
     
     # Processing Information
     current_step = Column(String(100), nullable=True)
     completion_percentage = Column(Float, default=0.0, nullable=False)
-    required_documents = Column(JSON, nullable=True)  # List of required document types
-    submitted_documents = Column(JSON, nullable=True)  # List of submitted document IDs
+    required_documents = Column(JSONB, nullable=True)  # List of required document types
+    submitted_documents = Column(JSONB, nullable=True)  # List of submitted document IDs
     
     # Results
     overall_risk_score = Column(Float, nullable=True)
@@ -188,8 +263,8 @@ class KYCSession(Base):
     manual_review_reason = Column(Text, nullable=True)
     
     # Timestamps
-    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
-    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc), nullable=False)
+    created_at = Column(DateTime, server_default=utc_now(), nullable=False)
+    updated_at = Column(DateTime, server_default=utc_now(), onupdate=utc_now(), nullable=False)
     started_at = Column(DateTime, nullable=True)
     completed_at = Column(DateTime, nullable=True)
     expires_at = Column(DateTime, nullable=True)
@@ -200,12 +275,12 @@ class KYCSession(Base):
     
     # Relationships
     customer = relationship("Customer", back_populates="kyc_sessions")
-    workflow_steps = relationship("WorkflowStep", back_populates="session", cascade="all, delete-orphan")
+    workflow_steps = relationship("WorkflowStep", back_populates="session", cascade="all, delete-orphan",
+                                  passive_deletes=True, lazy="selectin")
     
     # Indexes
     __table_args__ = (
-        Index('idx_session_customer_id', 'customer_id'),
-        Index('idx_session_status', 'status'),
+        Index('idx_session_customer_status', 'customer_id', 'status'),
         Index('idx_session_created_at', 'created_at'),
         Index('idx_session_assigned_user', 'assigned_to_user_id'),
     )
@@ -215,8 +290,10 @@ class KYCSession(Base):
 class User(Base):
     """System users"""
     __tablename__ = "users"
+    # Fetch server-generated timestamps via RETURNING on INSERT and UPDATE
+    __mapper_args__ = {"eager_defaults": True}
 
-    user_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     username = Column(String(50), unique=True, nullable=False, index=True)
     email = Column(String(255), unique=True, nullable=False, index=True)
     password_hash = Column(String(255), nullable=False)
@@ -224,7 +301,7 @@ class User(Base):
     # User Information
     first_name = Column(String(100), nullable=True)
     last_name = Column(String(100), nullable=True)
-    role = Column(SQLEnum(UserRole), nullable=False)
+    role = Column(IntEnum(UserRole), nullable=False)
     department = Column(String(100), nullable=True)
     supervisor_id = Column(UUID(as_uuid=True), ForeignKey("users.user_id"), nullable=True)
     
@@ -235,14 +312,19 @@ class User(Base):
     locked_until = Column(DateTime, nullable=True)
     
     # Timestamps
-    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
-    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc), nullable=False)
+    created_at = Column(DateTime, server_default=utc_now(), nullable=False)
+    updated_at = Column(DateTime, server_default=utc_now(), onupdate=utc_now(), nullable=False)
     last_login_at = Column(DateTime, nullable=True)
     password_changed_at = Column(DateTime, nullable=True)
     
     # Relationships
     subordinates = relationship("User", backref="supervisor", remote_side=[user_id])
-    audit_logs = relationship("AuditLog", back_populates="user")
+    audit_logs = relationship("AuditLog", back_populates="user", passive_deletes=True)
+    
+    # Indexes
+    __table_args__ = (
+        Index('idx_user_supervisor', 'supervisor_id'),
+    )
 
 
 # PII Detection Models
@@ -250,8 +332,8 @@ class PIIDetection(Base):
     """PII detection results"""
     __tablename__ = "pii_detections"
 
-    detection_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    document_id = Column(UUID(as_uuid=True), ForeignKey("documents.document_id"), nullable=False)
+    detection_id = Column(BigInteger, Identity(always=True), primary_key=True)
+    document_id = Column(UUID(as_uuid=True), ForeignKey("documents.document_id", ondelete="CASCADE"), nullable=False)
     
     # Detection Information
     pii_type = Column(String(100), nullable=False)
@@ -262,22 +344,27 @@ class PIIDetection(Base):
     position_end = Column(Integer, nullable=True)
     
     # Detection Context
-    context_before = Column(String(200), nullable=True)
-    context_after = Column(String(200), nullable=True)
+    context_before = deferred(Column(String(200), nullable=True), group="pii_context")
+    context_after = deferred(Column(String(200), nullable=True), group="pii_context")
     detection_method = Column(String(100), nullable=False)
     
     # Status
     is_confirmed = Column(Boolean, default=False, nullable=False)
     is_redacted = Column(Boolean, default=False, nullable=False)
-    risk_level = Column(SQLEnum(RiskLevel), default=RiskLevel.MEDIUM, nullable=False)
+    risk_level = Column(IntEnum(RiskLevel), default=RiskLevel.MEDIUM, nullable=False)
     
     # Timestamps
-    detected_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    detected_at = Column(DateTime, server_default=utc_now(), nullable=False)
     confirmed_at = Column(DateTime, nullable=True)
     redacted_at = Column(DateTime, nullable=True)
     
     # Relationships
     document = relationship("Document", back_populates="pii_detections")
+    
+    # Indexes
+    __table_args__ = (
+        Index('idx_pii_document_id', 'document_id'),
+    )
 
 
 # Document Authenticity Models
@@ -285,8 +372,8 @@ class AuthenticityCheck(Base):
     """Document authenticity check results"""
     __tablename__ = "authenticity_checks"
 
-    check_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    document_id = Column(UUID(as_uuid=True), ForeignKey("documents.document_id"), nullable=False)
+    check_id = Column(BigInteger, Identity(always=True), primary_key=True)
+    document_id = Column(UUID(as_uuid=True), ForeignKey("documents.document_id", ondelete="CASCADE"), nullable=False)
     
     # Check Information
     check_type = Column(String(100), nullable=False)
@@ -295,19 +382,25 @@ class AuthenticityCheck(Base):
     confidence_level = Column(Float, nullable=False)
     
     # Check Results
-    fraud_indicators = Column(JSON, nullable=True)
-    check_details = Column(JSON, nullable=True)
-    risk_factors = Column(JSON, nullable=True)
+    fraud_indicators = Column(JSONB, nullable=True)
+    check_details = Column(JSONB, nullable=True)
+    risk_factors = Column(JSONB, nullable=True)
     
     # Analysis Method
     analysis_method = Column(String(100), nullable=False)
     azure_analysis_used = Column(Boolean, default=False, nullable=False)
     
     # Timestamps
-    checked_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    checked_at = Column(DateTime, server_default=utc_now(), nullable=False)
     
     # Relationships
     document = relationship("Document", back_populates="authenticity_checks")
+    
+    # Indexes
+    __table_args__ = (
+        Index('idx_authenticity_document_id', 'document_id'),
+        Index('idx_authenticity_fraud_indicators_gin', 'fraud_indicators', postgresql_using='gin'),
+    )
 
 
 # Risk Assessment Models
@@ -315,17 +408,17 @@ class RiskAssessment(Base):
     """Customer risk assessment"""
     __tablename__ = "risk_assessments"
 
-    assessment_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    customer_id = Column(UUID(as_uuid=True), ForeignKey("customers.customer_id"), nullable=False)
+    assessment_id = Column(BigInteger, Identity(always=True), primary_key=True)
+    customer_id = Column(UUID(as_uuid=True), ForeignKey("customers.customer_id", ondelete="CASCADE"), nullable=False)
     
     # Assessment Information
     assessment_type = Column(String(100), nullable=False)
     overall_score = Column(Float, nullable=False)
-    risk_level = Column(SQLEnum(RiskLevel), nullable=False)
+    risk_level = Column(IntEnum(RiskLevel), nullable=False)
     
     # Risk Factors
-    risk_factors = Column(JSON, nullable=True)
-    mitigating_factors = Column(JSON, nullable=True)
+    risk_factors = Column(JSONB, nullable=True)
+    mitigating_factors = Column(JSONB, nullable=True)
     
     # Assessment Details
     assessment_method = Column(String(100), nullable=False)
@@ -337,10 +430,16 @@ class RiskAssessment(Base):
     expires_at = Column(DateTime, nullable=True)
     
     # Timestamps
-    assessed_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    assessed_at = Column(DateTime, server_default=utc_now(), nullable=False)
     
     # Relationships
     customer = relationship("Customer", back_populates="risk_assessments")
+    
+    # Indexes
+    __table_args__ = (
+        Index('idx_risk_customer', 'customer_id'),
+        Index('idx_risk_factors_gin', 'risk_factors', postgresql_using='gin'),
+    )
 
 
 # Workflow Models
@@ -348,8 +447,8 @@ class WorkflowStep(Base):
     """KYC workflow steps"""
     __tablename__ = "workflow_steps"
 
-    step_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    session_id = Column(UUID(as_uuid=True), ForeignKey("kyc_sessions.session_id"), nullable=False)
+    step_id = Column(BigInteger, Identity(always=True), primary_key=True)
+    session_id = Column(UUID(as_uuid=True), ForeignKey("kyc_sessions.session_id", ondelete="CASCADE"), nullable=False)
     
     # Step Information
     step_name = Column(String(100), nullable=False)
@@ -359,11 +458,11 @@ class WorkflowStep(Base):
     # Step Status
     status = Column(String(50), default="pending", nullable=False)
     is_required = Column(Boolean, default=True, nullable=False)
-    is_completed = Column(Boolean, default=False, nullable=False)
+    is_completed = Column(Boolean, Computed("status = 'completed'", persisted=True))
     
     # Step Details
-    input_data = Column(JSON, nullable=True)
-    output_data = Column(JSON, nullable=True)
+    input_data = Column(JSONB, nullable=True)
+    output_data = Column(JSONB, nullable=True)
     error_message = Column(Text, nullable=True)
     
     # Processing Information
@@ -371,53 +470,131 @@ class WorkflowStep(Base):
     processing_duration_seconds = Column(Float, nullable=True)
     
     # Timestamps
-    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    created_at = Column(DateTime, server_default=utc_now(), nullable=False)
     started_at = Column(DateTime, nullable=True)
     completed_at = Column(DateTime, nullable=True)
     
     # Relationships
     session = relationship("KYCSession", back_populates="workflow_steps")
+    
+    # Indexes
+    __table_args__ = (
+        Index('idx_workflow_session_status', 'session_id', 'status'),
+        Index('idx_workflow_pending', 'session_id', postgresql_where=is_completed.is_(False)),
+    )
 
 
 # Audit Models
+class IPAddress(Base):
+    """Distinct client IP addresses referenced by audit logs"""
+    __tablename__ = "ip_addresses"
+
+    ip_address_id = Column(Integer, Identity(always=True), primary_key=True)
+    address = Column(INET, unique=True, nullable=False)
+
+
+class UserAgent(Base):
+    """Distinct client user agent strings referenced by audit logs"""
+    __tablename__ = "user_agents"
+
+    user_agent_id = Column(Integer, Identity(always=True), primary_key=True)
+    user_agent = Column(String(500), unique=True, nullable=False)
+
+
 class AuditLog(Base):
     """Comprehensive audit logging"""
     __tablename__ = "audit_logs"
 
-    log_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    log_id = Column(BigInteger, primary_key=True, autoincrement=True)
     
     # Event Information
-    action = Column(String(100), nullable=False, index=True)
+    action = Column(String(100), nullable=False)
     resource_type = Column(String(100), nullable=True)
     resource_id = Column(String(255), nullable=True)
     
     # User Information
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.user_id"), nullable=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.user_id", ondelete="SET NULL"), nullable=True)
     username = Column(String(100), nullable=True)
     
-    # Request Information
-    ip_address = Column(String(45), nullable=True)
-    user_agent = Column(String(500), nullable=True)
+    # Request Information (ip address and user agent are deduplicated into lookup tables)
+    ip_address_id = Column(Integer, ForeignKey("ip_addresses.ip_address_id"), nullable=True)
+    user_agent_id = Column(Integer, ForeignKey("user_agents.user_agent_id"), nullable=True)
     request_id = Column(String(100), nullable=True)
     
     # Event Details
-    event_data = Column(JSON, nullable=True)
-    old_values = Column(JSON, nullable=True)
-    new_values = Column(JSON, nullable=True)
+    event_data = deferred(Column(JSONB, nullable=True), group="audit_details")
+    old_values = deferred(Column(JSONB, nullable=True), group="audit_details")
+    new_values = deferred(Column(JSONB, nullable=True), group="audit_details")
     
     # Status
     status = Column(String(50), nullable=False)
     error_message = Column(Text, nullable=True)
     
     # Timestamps
-    timestamp = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False, index=True)
+    # Partition key, so it is part of the primary key
+    timestamp = Column(DateTime, primary_key=True, server_default=utc_now(), nullable=False, index=True)
     
     # Relationships
     user = relationship("User", back_populates="audit_logs")
+    ip_address = relationship("IPAddress")
+    user_agent = relationship("UserAgent")
     
     # Indexes
     __table_args__ = (
         Index('idx_audit_action_timestamp', 'action', 'timestamp'),
         Index('idx_audit_user_timestamp', 'user_id', 'timestamp'),
         Index('idx_audit_resource', 'resource_type', 'resource_id'),
+        Index('idx_audit_event_data_gin', 'event_data', postgresql_using='gin'),
+        Index('idx_audit_errors', 'timestamp', postgresql_where=status == 'error'),
+        {'postgresql_partition_by': 'RANGE (timestamp)'},
     )
+
+
+def _updatable_fields(model) -> frozenset:
+    """Columns a generic update may set: everything but keys, generated columns and row timestamps"""
+    return frozenset(
+        column.key for column in model.__table__.columns
+        if not column.primary_key and column.computed is None
+        and column.key not in ("created_at", "updated_at")
+    )
+
+
+# Allow-lists for the repositories' dict-driven updates, derived once at import time
+Customer.UPDATABLE_FIELDS = _updatable_fields(Customer)
+Document.UPDATABLE_FIELDS = _updatable_fields(Document)
+User.UPDATABLE_FIELDS = _updatable_fields(User)
+
+
+# Trigram operator classes used by the customer search indexes
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
+
+# Catch-all partition so inserts never fail when a monthly partition is missing
+event.listen(
+    AuditLog.__table__,
+    "after_create",
+    DDL("CREATE TABLE IF NOT EXISTS audit_logs_default PARTITION OF audit_logs DEFAULT")
+    .execute_if(dialect="postgresql"),
+)
+
+
+def create_audit_log_partitions(bind, months_ahead: int = 1):
+    """Create monthly audit_logs partitions for the current month and the next ``months_ahead``"""
+    if bind.dialect.name != "postgresql":
+        return
+    
+    now = datetime.now(timezone.utc)
+    year, month = now.year, now.month
+    with bind.begin() as conn:
+        for _ in range(months_ahead + 1):
+            next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS audit_logs_{year:04d}_{month:02d} "
+                f"PARTITION OF audit_logs "
+                f"FOR VALUES FROM ('{year:04d}-{month:02d}-01') TO ('{next_year:04d}-{next_month:02d}-01')"
+            ))
+            year, month = next_year, next_month
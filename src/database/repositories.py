@@ -2,18 +2,59 @@
 Repository pattern for database operations
 Provides clean interfaces for database CRUD operations
 """
-from typing import List, Optional, Dict, Any
-from sqlalchemy.orm import Session
+import base64
+import copy
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import List, Optional, Dict, Any, Tuple, Union
+from sqlalchemy.orm import Session, make_transient_to_detached, selectinload
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import and_, or_, desc, asc
-from datetime import datetime, timezone
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy import and_, or_, desc, asc, bindparam, case, func, insert, select, tuple_, update
+from datetime import datetime, timezone, timedelta
 import uuid
 
-from database.models import Customer, Document, KYCSession, User, AuditLog, PIIDetection, AuthenticityCheck, RiskAssessment
-from database.config import get_db
+from database.models import (
+    Customer, Document, KYCSession, User, AuditLog, IPAddress, UserAgent,
+    PIIDetection, AuthenticityCheck, RiskAssessment, RiskLevel, utc_now
+)
+from database.config import SessionLocal
 from models.kyc_models import DocumentType, DocumentStatus, KYCStatus
 from auth.models import UserRole
 
+logger = logging.getLogger(__name__)
+
+
+# Prebuilt point-lookup statements; the bound values are supplied per call
+_GET_CUSTOMER_STMT = select(Customer).where(Customer.customer_id == bindparam("customer_id"))
+_GET_DOCUMENT_STMT = select(Document).where(Document.document_id == bindparam("document_id"))
+_GET_SESSION_STMT = select(KYCSession).where(KYCSession.session_id == bindparam("session_id"))
+_GET_USER_STMT = select(User).where(User.user_id == bindparam("user_id"))
+_GET_USER_BY_USERNAME_STMT = select(User).where(User.username == bindparam("username"))
+_GET_USER_BY_EMAIL_STMT = select(User).where(User.email == bindparam("email"))
+
+
+def encode_cursor(*values) -> str:
+    """Encode keyset pagination values as an opaque URL-safe cursor"""
+    payload = [value.isoformat() if isinstance(value, datetime) else str(value) for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_cursor(cursor: str, *types) -> tuple:
+    """Decode a cursor from encode_cursor, converting each value with the matching type
+    
+    Raises ValueError for malformed cursors.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return tuple(convert(value) for convert, value in zip(types, values, strict=True))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid pagination cursor") from e
+
 
 class BaseRepository:
     """Base repository with common operations"""
@@ -32,26 +73,95 @@ class BaseRepository:
     def rollback(self):
         """Rollback transaction"""
         self.db.rollback()
+    
+    def _update_returning(self, model, where, values: Dict[str, Any]):
+        """Apply one UPDATE ... RETURNING and commit, returning the updated entity or None"""
+        stmt = (update(model)
+                .where(where)
+                .values(**values)
+                .returning(model)
+                .execution_options(synchronize_session=False, populate_existing=True))
+        entity = self.db.execute(stmt).scalar_one_or_none()
+        self.commit()
+        return entity
+    
+    def _save(self, entity, commit: bool):
+        """Persist a new entity, either committing now or flushing into the caller's transaction"""
+        self.db.add(entity)
+        if commit:
+            self.commit()
+        else:
+            self.db.flush()
+        return entity
+
+
+# Dashboard statistics are served from a per-process snapshot for this many seconds
+CUSTOMER_STATS_TTL = int(os.getenv("CUSTOMER_STATS_TTL", "60"))
+
+
+class _CustomerStatsCache:
+    """Per-process TTL snapshot of get_customer_statistics
+    
+    Customer writes made through this process drop the snapshot right away;
+    writes from other processes show up once the TTL expires. The snapshot is
+    deep-copied in and out, so callers never share its breakdown dicts.
+    """
+    
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self._entry = None
+        self._lock = threading.Lock()
+    
+    def get(self) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if self._entry is None or self._entry[0] <= time.monotonic():
+                self._entry = None
+                return None
+            return copy.deepcopy(self._entry[1])
+    
+    def set(self, stats: Dict[str, Any]):
+        with self._lock:
+            self._entry = (time.monotonic() + self.ttl, copy.deepcopy(stats))
+    
+    def invalidate(self):
+        with self._lock:
+            self._entry = None
+
+
+_customer_stats_cache = _CustomerStatsCache(CUSTOMER_STATS_TTL)
 
 
 class CustomerRepository(BaseRepository):
     """Repository for Customer operations"""
     
-    def create_customer(self, customer_data: Dict[str, Any]) -> Customer:
+    def create_customer(self, customer_data: Dict[str, Any], commit: bool = True) -> Customer:
         """Create a new customer"""
-        customer = Customer(**customer_data)
-        self.db.add(customer)
-        self.commit()
-        self.db.refresh(customer)
+        customer = self._save(Customer(**customer_data), commit)
+        _customer_stats_cache.invalidate()
         return customer
     
     def get_customer(self, customer_id: str) -> Optional[Customer]:
         """Get customer by ID"""
-        return self.db.query(Customer).filter(Customer.customer_id == customer_id).first()
+        return self.db.execute(_GET_CUSTOMER_STMT, {"customer_id": customer_id}).scalar_one_or_none()
+    
+    def get_customer_with_related(self, customer_id: str,
+                                  include_documents: bool = True,
+                                  include_sessions: bool = True) -> Optional[Customer]:
+        """Get customer by ID with documents and/or KYC sessions batch-loaded
+        
+        Each requested collection is fetched with one IN query, so callers
+        can traverse them without per-row lazy loads.
+        """
+        query = self.db.query(Customer)
+        if include_documents:
+            query = query.options(selectinload(Customer.documents))
+        if include_sessions:
+            query = query.options(selectinload(Customer.kyc_sessions))
+        return query.filter(Customer.customer_id == customer_id).first()
     
     def get_customer_by_email(self, email: str) -> Optional[Customer]:
-        """Get customer by email"""
-        return self.db.query(Customer).filter(Customer.email == email).first()
+        """Get customer by email (case-insensitive)"""
+        return self.db.query(Customer).filter(func.lower(Customer.email) == email.lower()).first()
     
     def get_customer_by_external_id(self, external_id: str) -> Optional[Customer]:
         """Get customer by external ID"""
@@ -63,32 +173,27 @@ class CustomerRepository(BaseRepository):
         if not customer:
             return None
         
-        for key, value in update_data.items():
-            if hasattr(customer, key):
-                setattr(customer, key, value)
+        for key in update_data.keys() & Customer.UPDATABLE_FIELDS:
+            setattr(customer, key, update_data[key])
         
         customer.updated_at = datetime.now(timezone.utc)
         self.commit()
-        self.db.refresh(customer)
+        _customer_stats_cache.invalidate()
         return customer
     
     def update_kyc_status(self, customer_id: str, status: KYCStatus, notes: str = None) -> Optional[Customer]:
         """Update customer KYC status"""
-        customer = self.get_customer(customer_id)
-        if not customer:
-            return None
-        
-        customer.kyc_status = status
-        customer.updated_at = datetime.now(timezone.utc)
+        now = datetime.now(timezone.utc)
+        values = {"kyc_status": status, "updated_at": now}
         
         if status in [KYCStatus.APPROVED, KYCStatus.REJECTED]:
-            customer.kyc_completed_at = datetime.now(timezone.utc)
+            values["kyc_completed_at"] = now
         
         if notes:
-            customer.notes = notes
+            values["notes"] = notes
         
-        self.commit()
-        self.db.refresh(customer)
+        customer = self._update_returning(Customer, Customer.customer_id == customer_id, values)
+        _customer_stats_cache.invalidate()
         return customer
     
     def get_customers_by_status(self, status: KYCStatus, limit: int = 100, offset: int = 0) -> List[Customer]:
@@ -100,18 +205,15 @@ class CustomerRepository(BaseRepository):
                 .limit(limit)
                 .all())
     
-    def search_customers(self, search_term: str = "", filters: Dict[str, Any] = None) -> List[Customer]:
-        """Search customers with advanced filters"""
-        query = self.db.query(Customer)
-        
-        # Apply search term if provided
+    def _filter_customers(self, query, search_term: str, filters: Dict[str, Any]):
+        """Apply the search term and attribute filters shared by the customer searches"""
+        # Apply search term if provided (each ILIKE is served by a pg_trgm GIN index)
         if search_term:
             search_pattern = f"%{search_term}%"
             query = query.filter(or_(
-                Customer.first_name.ilike(search_pattern),
-                Customer.last_name.ilike(search_pattern),
+                Customer.full_name.ilike(search_pattern),
                 Customer.email.ilike(search_pattern),
-                Customer.phone.ilike(search_pattern)
+                Customer.phone_number.ilike(search_pattern)
             ))
         
         # Apply filters if provided
@@ -140,56 +242,88 @@ class CustomerRepository(BaseRepository):
             if 'created_before' in filters:
                 query = query.filter(Customer.created_at <= filters['created_before'])
         
-        # Apply ordering
-        query = query.order_by(desc(Customer.created_at))
+        return query
+    
+    def _paginate_customers(self, query, customer, filters: Dict[str, Any]):
+        """Order by newest first and apply keyset or offset pagination"""
+        # Apply ordering (customer_id breaks ties so keyset pages are stable)
+        query = query.order_by(desc(customer.created_at), desc(customer.customer_id))
         
-        # Apply pagination
+        # Apply pagination: keyset via 'after' = (created_at, customer_id) of the last row seen, else offset
         if filters:
-            if 'offset' in filters:
+            if filters.get('after'):
+                query = query.filter(tuple_(customer.created_at, customer.customer_id) < tuple_(*filters['after']))
+            elif 'offset' in filters:
                 query = query.offset(filters['offset'])
             if 'limit' in filters:
                 query = query.limit(filters['limit'])
         
-        return query.all()
+        return query
+    
+    def search_customers(self, search_term: str = "", filters: Dict[str, Any] = None) -> List[Customer]:
+        """Search customers with advanced filters"""
+        query = self._filter_customers(self.db.query(Customer), search_term, filters)
+        return self._paginate_customers(query, Customer, filters).all()
+    
+    def search_customers_with_total(self, search_term: str = "",
+                                    filters: Dict[str, Any] = None) -> Tuple[List[Customer], Optional[int]]:
+        """Search customers and count every match
+        
+        The page query keeps its keyset or offset window, so only ``limit`` rows
+        are read and sorted. The total is a separate count(*) over the filtered
+        rows, run only when no cursor is given; cursor pages return None and
+        callers keep the total reported with the first page.
+        """
+        customers = self.search_customers(search_term, filters)
+        if filters and filters.get('after'):
+            return customers, None
+        total = self._filter_customers(
+            self.db.query(func.count(Customer.customer_id)), search_term, filters
+        ).scalar()
+        return customers, total
     
     def get_customer_by_id(self, customer_id: str) -> Optional[Customer]:
         """Get customer by ID (alias for get_customer)"""
         return self.get_customer(customer_id)
     
     def get_customer_statistics(self) -> Dict[str, Any]:
-        """Get customer statistics for dashboard"""
-        from sqlalchemy import func
-        from datetime import datetime, timedelta
-        
-        # Basic counts
-        total_customers = self.db.query(Customer).count()
-        active_customers = self.db.query(Customer).filter(Customer.is_active == True).count()
-        inactive_customers = total_customers - active_customers
+        """Get customer statistics for dashboard
         
-        # KYC status breakdown
-        kyc_status_data = (self.db.query(Customer.kyc_status, func.count(Customer.customer_id))
-                          .group_by(Customer.kyc_status)
-                          .all())
-        kyc_status_breakdown = {status: count for status, count in kyc_status_data}
+        All counts come from one pass over customers using filtered aggregates,
+        and the result is reused for CUSTOMER_STATS_TTL seconds.
+        """
+        cached = _customer_stats_cache.get()
+        if cached is not None:
+            return cached
         
-        # Risk level breakdown
-        risk_level_data = (self.db.query(Customer.risk_level, func.count(Customer.customer_id))
-                          .group_by(Customer.risk_level)
-                          .all())
-        risk_level_breakdown = {level: count for level, count in risk_level_data}
-        
-        # Recent registrations (last 30 days)
         thirty_days_ago = datetime.now(timezone.utc) - timedelta(days=30)
-        recent_registrations = (self.db.query(Customer)
-                               .filter(Customer.created_at >= thirty_days_ago)
-                               .count())
+        kyc_statuses = list(KYCStatus)
+        risk_levels = list(RiskLevel)
+        
+        row = self.db.query(
+            func.count(),
+            func.count().filter(Customer.is_active == True),
+            func.count().filter(Customer.created_at >= thirty_days_ago),
+            *[func.count().filter(Customer.kyc_status == status) for status in kyc_statuses],
+            *[func.count().filter(Customer.risk_level == level) for level in risk_levels]
+        ).select_from(Customer).one()
+        
+        total_customers, active_customers, recent_registrations = row[:3]
+        inactive_customers = total_customers - active_customers
+        kyc_counts = row[3:3 + len(kyc_statuses)]
+        risk_counts = row[3 + len(kyc_statuses):]
+        
+        # Breakdowns only list values that occur, as a GROUP BY would, keyed
+        # by the plain enum value so the response serializes without coercion
+        kyc_status_breakdown = {status.value: count for status, count in zip(kyc_statuses, kyc_counts) if count}
+        risk_level_breakdown = {level.value: count for level, count in zip(risk_levels, risk_counts) if count}
         
         # Specific KYC counts
-        pending_kyc_count = kyc_status_breakdown.get(KYCStatus.PENDING, 0)
-        approved_kyc_count = kyc_status_breakdown.get(KYCStatus.APPROVED, 0)
-        rejected_kyc_count = kyc_status_breakdown.get(KYCStatus.REJECTED, 0)
+        pending_kyc_count = kyc_status_breakdown.get(KYCStatus.PENDING.value, 0)
+        approved_kyc_count = kyc_status_breakdown.get(KYCStatus.APPROVED.value, 0)
+        rejected_kyc_count = kyc_status_breakdown.get(KYCStatus.REJECTED.value, 0)
         
-        return {
+        stats = {
             "total_customers": total_customers,
             "active_customers": active_customers,
             "inactive_customers": inactive_customers,
@@ -200,22 +334,20 @@ class CustomerRepository(BaseRepository):
             "approved_kyc_count": approved_kyc_count,
             "rejected_kyc_count": rejected_kyc_count
         }
+        _customer_stats_cache.set(stats)
+        return stats
 
 
 class DocumentRepository(BaseRepository):
     """Repository for Document operations"""
     
-    def create_document(self, document_data: Dict[str, Any]) -> Document:
+    def create_document(self, document_data: Dict[str, Any], commit: bool = True) -> Document:
         """Create a new document"""
-        document = Document(**document_data)
-        self.db.add(document)
-        self.commit()
-        self.db.refresh(document)
-        return document
+        return self._save(Document(**document_data), commit)
     
     def get_document(self, document_id: str) -> Optional[Document]:
         """Get document by ID"""
-        return self.db.query(Document).filter(Document.document_id == document_id).first()
+        return self.db.execute(_GET_DOCUMENT_STMT, {"document_id": document_id}).scalar_one_or_none()
     
     def get_customer_documents(self, customer_id: str, document_type: DocumentType = None) -> List[Document]:
         """Get all documents for a customer"""
@@ -232,24 +364,18 @@ class DocumentRepository(BaseRepository):
     
     def update_document_status(self, document_id: str, status: DocumentStatus, error: str = None) -> Optional[Document]:
         """Update document processing status"""
-        document = self.get_document(document_id)
-        if not document:
-            return None
-        
-        document.status = status
-        document.updated_at = datetime.now(timezone.utc)
+        now = datetime.now(timezone.utc)
+        values = {"status": status, "updated_at": now}
         
         if status == DocumentStatus.PROCESSING:
-            document.processing_started_at = datetime.now(timezone.utc)
+            values["processing_started_at"] = now
         elif status in [DocumentStatus.PROCESSED, DocumentStatus.FAILED]:
-            document.processing_completed_at = datetime.now(timezone.utc)
+            values["processing_completed_at"] = now
         
         if error:
-            document.processing_error = error
+            values["processing_error"] = error
         
-        self.commit()
-        self.db.refresh(document)
-        return document
+        return self._update_returning(Document, Document.document_id == document_id, values)
     
     def update_document_analysis(self, document_id: str, analysis_data: Dict[str, Any]) -> Optional[Document]:
         """Update document analysis results"""
@@ -257,17 +383,20 @@ class DocumentRepository(BaseRepository):
         if not document:
             return None
         
-        for key, value in analysis_data.items():
-            if hasattr(document, key):
-                setattr(document, key, value)
+        for key in analysis_data.keys() & Document.UPDATABLE_FIELDS:
+            setattr(document, key, analysis_data[key])
         
         document.updated_at = datetime.now(timezone.utc)
         self.commit()
-        self.db.refresh(document)
         return document
     
-    def get_documents_by_hash(self, file_hash: str) -> List[Document]:
-        """Find documents with the same hash (duplicates)"""
+    def get_documents_by_hash(self, file_hash: Union[bytes, str]) -> List[Document]:
+        """Find documents with the same hash (duplicates)
+        
+        Accepts the raw SHA-256 digest or its hex form.
+        """
+        if isinstance(file_hash, str):
+            file_hash = bytes.fromhex(file_hash)
         return self.db.query(Document).filter(Document.file_hash == file_hash).all()
     
     def get_pending_documents(self, limit: int = 100) -> List[Document]:
@@ -282,17 +411,13 @@ class DocumentRepository(BaseRepository):
 class KYCSessionRepository(BaseRepository):
     """Repository for KYC Session operations"""
     
-    def create_session(self, session_data: Dict[str, Any]) -> KYCSession:
+    def create_session(self, session_data: Dict[str, Any], commit: bool = True) -> KYCSession:
         """Create a new KYC session"""
-        session = KYCSession(**session_data)
-        self.db.add(session)
-        self.commit()
-        self.db.refresh(session)
-        return session
+        return self._save(KYCSession(**session_data), commit)
     
     def get_session(self, session_id: str) -> Optional[KYCSession]:
         """Get KYC session by ID"""
-        return self.db.query(KYCSession).filter(KYCSession.session_id == session_id).first()
+        return self.db.execute(_GET_SESSION_STMT, {"session_id": session_id}).scalar_one_or_none()
     
     def get_customer_sessions(self, customer_id: str) -> List[KYCSession]:
         """Get all KYC sessions for a customer"""
@@ -317,64 +442,144 @@ class KYCSessionRepository(BaseRepository):
     
     def update_session_status(self, session_id: str, status: KYCStatus, notes: str = None) -> Optional[KYCSession]:
         """Update KYC session status"""
-        session = self.get_session(session_id)
-        if not session:
-            return None
-        
-        old_status = session.status
-        session.status = status
-        session.updated_at = datetime.now(timezone.utc)
-        
-        if status == KYCStatus.IN_PROGRESS and old_status == KYCStatus.PENDING:
-            session.started_at = datetime.now(timezone.utc)
+        now = datetime.now(timezone.utc)
+        values = {"status": status, "updated_at": now}
+        
+        if status == KYCStatus.IN_PROGRESS:
+            # SET expressions see the pre-update row, so this checks the old status
+            values["started_at"] = case(
+                (KYCSession.status == KYCStatus.PENDING, now),
+                else_=KYCSession.started_at
+            )
         elif status in [KYCStatus.APPROVED, KYCStatus.REJECTED]:
-            session.completed_at = datetime.now(timezone.utc)
+            values["completed_at"] = now
         
         if notes:
-            session.decision_reason = notes
+            values["decision_reason"] = notes
         
-        self.commit()
-        self.db.refresh(session)
-        return session
+        return self._update_returning(KYCSession, KYCSession.session_id == session_id, values)
     
     def update_session_progress(self, session_id: str, percentage: float, current_step: str = None) -> Optional[KYCSession]:
         """Update session progress"""
-        session = self.get_session(session_id)
-        if not session:
-            return None
-        
-        session.completion_percentage = percentage
+        values = {"completion_percentage": percentage, "updated_at": datetime.now(timezone.utc)}
         if current_step:
-            session.current_step = current_step
-        session.updated_at = datetime.now(timezone.utc)
+            values["current_step"] = current_step
         
-        self.commit()
-        self.db.refresh(session)
-        return session
+        return self._update_returning(KYCSession, KYCSession.session_id == session_id, values)
+
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "30"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1024"))
+
+
+def _user_snapshot(user: User) -> Dict[str, Any]:
+    """Plain column values of a user, safe to share across sessions and threads"""
+    return {attr.key: getattr(user, attr.key) for attr in User.__mapper__.column_attrs}
+
+
+class _UserCache:
+    """Per-process TTL cache of user snapshots by username and by role
+    
+    Holds plain dicts rather than ORM instances, so nothing is ever bound to
+    another request's session. Any user write drops the role lists and the
+    written user's entry.
+    """
+    
+    def __init__(self, maxsize: int, ttl: int):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._by_username: "OrderedDict[str, tuple]" = OrderedDict()
+        self._by_role: Dict[UserRole, tuple] = {}
+        self._lock = threading.Lock()
+    
+    def get_user(self, username: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._by_username.get(username)
+            if entry is None or entry[0] <= time.monotonic():
+                self._by_username.pop(username, None)
+                return None
+            self._by_username.move_to_end(username)
+            return entry[1]
+    
+    def set_user(self, username: str, snapshot: Dict[str, Any]):
+        with self._lock:
+            self._by_username[username] = (time.monotonic() + self.ttl, snapshot)
+            self._by_username.move_to_end(username)
+            while len(self._by_username) > self.maxsize:
+                self._by_username.popitem(last=False)
+    
+    def get_role(self, role: UserRole) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            entry = self._by_role.get(role)
+            if entry is None or entry[0] <= time.monotonic():
+                self._by_role.pop(role, None)
+                return None
+            return entry[1]
+    
+    def set_role(self, role: UserRole, snapshots: List[Dict[str, Any]]):
+        with self._lock:
+            self._by_role[role] = (time.monotonic() + self.ttl, snapshots)
+    
+    def invalidate(self, user_id: Optional[str] = None):
+        """Drop cached role lists and, if given, every entry for user_id"""
+        with self._lock:
+            self._by_role.clear()
+            if user_id is not None:
+                user_id = str(user_id)
+                stale = [name for name, (_, snapshot) in self._by_username.items()
+                         if str(snapshot["user_id"]) == user_id]
+                for name in stale:
+                    del self._by_username[name]
+
+
+_user_cache = _UserCache(USER_CACHE_SIZE, USER_CACHE_TTL)
 
 
 class UserRepository(BaseRepository):
     """Repository for User operations"""
     
-    def create_user(self, user_data: Dict[str, Any]) -> User:
+    def create_user(self, user_data: Dict[str, Any], commit: bool = True) -> User:
         """Create a new user"""
-        user = User(**user_data)
-        self.db.add(user)
-        self.commit()
-        self.db.refresh(user)
+        user = self._save(User(**user_data), commit)
+        _user_cache.invalidate()
         return user
     
+    def _from_snapshot(self, snapshot: Dict[str, Any]) -> User:
+        """Attach a cached column snapshot to this session without a SELECT"""
+        user = User(**snapshot)
+        make_transient_to_detached(user)
+        return self.db.merge(user, load=False)
+    
     def get_user(self, user_id: str) -> Optional[User]:
         """Get user by ID"""
-        return self.db.query(User).filter(User.user_id == user_id).first()
-    
-    def get_user_by_username(self, username: str) -> Optional[User]:
-        """Get user by username"""
-        return self.db.query(User).filter(User.username == username).first()
+        return self.db.execute(_GET_USER_STMT, {"user_id": user_id}).scalar_one_or_none()
+    
+    def get_user_by_username(self, username: str, use_cache: bool = False) -> Optional[User]:
+        """Get user by username, optionally served from a short-lived cache
+        
+        The cache is per process, so a lock, deactivation, role or password
+        change made by another worker can be missed for up to USER_CACHE_TTL
+        seconds. Reads are fresh by default; only pass use_cache=True where
+        the result is not used for authentication or authorization.
+        """
+        snapshot = _user_cache.get_user(username) if use_cache else None
+        if snapshot is not None:
+            return self._from_snapshot(snapshot)
+        
+        user = self.db.execute(_GET_USER_BY_USERNAME_STMT, {"username": username}).scalar_one_or_none()
+        if user is not None:
+            _user_cache.set_user(username, _user_snapshot(user))
+        return user
     
     def get_user_by_email(self, email: str) -> Optional[User]:
         """Get user by email"""
-        return self.db.query(User).filter(User.email == email).first()
+        return self.db.execute(_GET_USER_BY_EMAIL_STMT, {"email": email}).scalar_one_or_none()
+    
+    def get_all_users(self):
+        """Get all users, projecting only the columns needed for listings"""
+        return (self.db.query(User.user_id, User.username, User.email, User.role, User.is_active, User.created_at,
+                              User.last_login_at.label("last_login"), User.department)
+                .order_by(asc(User.username))
+                .yield_per(200))
     
     def update_user(self, user_id: str, update_data: Dict[str, Any]) -> Optional[User]:
         """Update user information"""
@@ -382,58 +587,201 @@ class UserRepository(BaseRepository):
         if not user:
             return None
         
-        for key, value in update_data.items():
-            if hasattr(user, key):
-                setattr(user, key, value)
+        for key in update_data.keys() & User.UPDATABLE_FIELDS:
+            setattr(user, key, update_data[key])
         
         user.updated_at = datetime.now(timezone.utc)
         self.commit()
-        self.db.refresh(user)
+        _user_cache.invalidate(user_id)
         return user
     
     def update_login_info(self, user_id: str, success: bool = True) -> Optional[User]:
         """Update user login information"""
-        user = self.get_user(user_id)
-        if not user:
-            return None
-        
+        now = datetime.now(timezone.utc)
         if success:
-            user.last_login_at = datetime.now(timezone.utc)
-            user.failed_login_attempts = 0
-            user.locked_until = None
+            values = {"last_login_at": now, "failed_login_attempts": 0, "locked_until": None}
         else:
-            user.failed_login_attempts += 1
-            if user.failed_login_attempts >= 5:
+            attempts = User.failed_login_attempts + 1
+            values = {
+                "failed_login_attempts": attempts,
                 # Lock account for 30 minutes
-                user.locked_until = datetime.now(timezone.utc).replace(minute=datetime.now().minute + 30)
+                "locked_until": case((attempts >= 5, now + timedelta(minutes=30)), else_=User.locked_until)
+            }
         
-        self.commit()
-        self.db.refresh(user)
+        user = self._update_returning(User, User.user_id == user_id, values)
+        _user_cache.invalidate(user_id)
         return user
     
+    def record_successful_login(self, user_id: str):
+        """Clear the failed-login counter and lock and stamp the login time.
+        
+        Runs as a single UPDATE ... RETURNING and returns the new
+        (failed_login_attempts, locked_until, last_login_at) row, or None if
+        the user is missing.
+        """
+        stmt = (update(User)
+                .where(User.user_id == user_id)
+                .values(failed_login_attempts=0, locked_until=None, last_login_at=utc_now())
+                .returning(User.failed_login_attempts, User.locked_until, User.last_login_at)
+                .execution_options(synchronize_session=False))
+        row = self.db.execute(stmt).first()
+        self.commit()
+        _user_cache.invalidate(user_id)
+        return row
+    
+    def bump_failed_login(self, user_id: str, threshold: int = 5,
+                          lock_duration: timedelta = timedelta(hours=1)):
+        """Record a failed login and lock the account once the threshold is hit.
+        
+        Runs as a single UPDATE ... RETURNING and returns the new
+        (failed_login_attempts, locked_until) row, or None if the user is missing.
+        """
+        attempts = User.failed_login_attempts + 1
+        stmt = (update(User)
+                .where(User.user_id == user_id)
+                .values(failed_login_attempts=attempts,
+                        locked_until=case((attempts >= threshold, func.timezone('UTC', func.now()) + lock_duration),
+                                          else_=User.locked_until))
+                .returning(User.failed_login_attempts, User.locked_until)
+                .execution_options(synchronize_session=False))
+        row = self.db.execute(stmt).first()
+        self.commit()
+        _user_cache.invalidate(user_id)
+        return row
+    
     def get_users_by_role(self, role: UserRole) -> List[User]:
-        """Get users by role"""
-        return self.db.query(User).filter(User.role == role, User.is_active == True).all()
+        """Get active users by role, served from a short-lived cache when possible"""
+        snapshots = _user_cache.get_role(role)
+        if snapshots is None:
+            users = self.db.query(User).filter(User.role == role, User.is_active == True).all()
+            _user_cache.set_role(role, [_user_snapshot(user) for user in users])
+            return users
+        return [self._from_snapshot(snapshot) for snapshot in snapshots]
+
+
+# Lookup-table ids for deduplicated audit request metadata, keyed by (model, value).
+# Only filled after the inserting transaction commits, so ids are never stale.
+_AUDIT_LOOKUP_CACHE_SIZE = 4096
+
+
+class _AuditLookupCache:
+    """Per-process LRU of lookup-table ids, shared by request threads and the audit buffer"""
+    
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._ids: "OrderedDict[tuple, int]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: tuple) -> Optional[int]:
+        with self._lock:
+            row_id = self._ids.get(key)
+            if row_id is not None:
+                self._ids.move_to_end(key)
+            return row_id
+    
+    def update(self, ids: Dict[tuple, int]):
+        with self._lock:
+            for key, row_id in ids.items():
+                self._ids[key] = row_id
+                self._ids.move_to_end(key)
+            while len(self._ids) > self.maxsize:
+                self._ids.popitem(last=False)
+
+
+_audit_lookup_cache = _AuditLookupCache(_AUDIT_LOOKUP_CACHE_SIZE)
 
 
 class AuditRepository(BaseRepository):
     """Repository for Audit Log operations"""
     
-    def create_audit_log(self, log_data: Dict[str, Any]) -> AuditLog:
+    def _lookup_id(self, model, column, value: str, pending: Dict[tuple, int]) -> int:
+        """Get or create the lookup row for an IP address or user agent"""
+        key = (model.__tablename__, value)
+        cached = pending.get(key) or _audit_lookup_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        pk = model.__mapper__.primary_key[0]
+        row_id = self.db.execute(
+            pg_insert(model)
+            .values({column.key: value})
+            .on_conflict_do_nothing(index_elements=[column.key])
+            .returning(pk)
+        ).scalar()
+        if row_id is None:
+            row_id = self.db.query(pk).filter(column == value).scalar()
+        
+        pending[key] = row_id
+        return row_id
+    
+    def _resolve_request_metadata(self, log_data: Dict[str, Any], pending: Dict[tuple, int]) -> Dict[str, Any]:
+        """Swap inline ip_address/user_agent strings for lookup-table ids"""
+        row = dict(log_data)
+        ip_address = row.pop("ip_address", None)
+        user_agent = row.pop("user_agent", None)
+        row["ip_address_id"] = (self._lookup_id(IPAddress, IPAddress.address, ip_address, pending)
+                                if ip_address else row.get("ip_address_id"))
+        row["user_agent_id"] = (self._lookup_id(UserAgent, UserAgent.user_agent, user_agent, pending)
+                                if user_agent else row.get("user_agent_id"))
+        return row
+    
+    def _remember_lookups(self, pending: Dict[tuple, int]):
+        """Publish lookup ids from a committed transaction to the process cache"""
+        _audit_lookup_cache.update(pending)
+    
+    def create_audit_log(self, log_data: Dict[str, Any], commit: bool = True) -> AuditLog:
         """Create a new audit log entry"""
-        audit_log = AuditLog(**log_data)
-        self.db.add(audit_log)
-        self.commit()
-        self.db.refresh(audit_log)
+        pending = {}
+        audit_log = self._save(AuditLog(**self._resolve_request_metadata(log_data, pending)), commit)
+        if commit:
+            self._remember_lookups(pending)
         return audit_log
     
+    def _existing_user_ids(self, user_ids) -> set:
+        """The subset of ``user_ids`` that have a users row, as strings"""
+        user_ids = {str(user_id) for user_id in user_ids}
+        if not user_ids:
+            return set()
+        return {str(user_id) for (user_id,) in self.db.query(User.user_id).filter(User.user_id.in_(user_ids))}
+    
+    def bulk_create_audit_logs(self, rows: List[Dict[str, Any]]) -> int:
+        """Insert many audit log entries in one executemany round trip
+        
+        Goes through Core instead of the ORM, so no AuditLog objects are
+        built or tracked. Rows are grouped by key set, since executemany
+        needs every row in a statement to bind the same columns. A user_id
+        without a users row is stored as NULL rather than failing the
+        foreign key for the whole batch.
+        """
+        if not rows:
+            return 0
+        
+        known_users = self._existing_user_ids(row["user_id"] for row in rows if row.get("user_id"))
+        pending = {}
+        groups: Dict[tuple, List[Dict[str, Any]]] = {}
+        for row in rows:
+            row = self._resolve_request_metadata(row, pending)
+            if row.get("user_id") and str(row["user_id"]) not in known_users:
+                row["user_id"] = None  # e.g. development users, which have no users row
+            groups.setdefault(tuple(sorted(row)), []).append(row)
+        for group in groups.values():
+            self.db.execute(insert(AuditLog.__table__), group)
+        self.commit()
+        self._remember_lookups(pending)
+        return len(rows)
+    
     def get_audit_logs(self, 
-                      user_id: str = None,
-                      action: str = None,
-                      resource_type: str = None,
-                      limit: int = 1000,
-                      offset: int = 0) -> List[AuditLog]:
-        """Get audit logs with filters"""
+                       user_id: str = None,
+                       action: str = None,
+                       resource_type: str = None,
+                       limit: int = 1000,
+                       offset: int = 0,
+                       after: Optional[tuple] = None) -> List[AuditLog]:
+        """Get audit logs with filters
+        
+        Pass the (timestamp, log_id) of the last row seen as ``after`` to
+        page by keyset instead of offset.
+        """
         query = self.db.query(AuditLog)
         
         if user_id:
@@ -443,15 +791,17 @@ class AuditRepository(BaseRepository):
         if resource_type:
             query = query.filter(AuditLog.resource_type == resource_type)
         
-        return (query.order_by(desc(AuditLog.timestamp))
-                .offset(offset)
+        if after:
+            query = query.filter(tuple_(AuditLog.timestamp, AuditLog.log_id) < tuple_(*after))
+        elif offset:
+            query = query.offset(offset)
+        
+        return (query.order_by(desc(AuditLog.timestamp), desc(AuditLog.log_id))
                 .limit(limit)
                 .all())
     
     def get_user_activity(self, user_id: str, days: int = 30) -> List[AuditLog]:
         """Get user activity for the last N days"""
-        from datetime import timedelta
-        
         since_date = datetime.now(timezone.utc) - timedelta(days=days)
         return (self.db.query(AuditLog)
                 .filter(and_(
@@ -462,33 +812,112 @@ class AuditRepository(BaseRepository):
                 .all())
 
 
+class AuditLogBuffer:
+    """Collect audit rows in memory and write them in batches
+    
+    Rows are flushed through AuditRepository.bulk_create_audit_logs once
+    max_size rows are queued or flush_interval seconds after the first
+    queued row, whichever comes first. Each flush uses its own session.
+    If the batch insert fails, the rows are retried one at a time so a
+    single bad row only loses itself. The API lifespan attaches it to the
+    audit logger and flushes it on shutdown.
+    """
+    
+    def __init__(self, max_size: int = 200, flush_interval: float = 1.0):
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self._rows = deque()
+        self._lock = threading.Lock()
+        self._timer = None
+    
+    def add(self, log_data: Dict[str, Any]):
+        """Queue an audit row"""
+        with self._lock:
+            self._rows.append(dict(log_data))
+            full = len(self._rows) >= self.max_size
+            if not full and self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush()
+    
+    def flush(self) -> int:
+        """Write all queued rows, returning how many were written"""
+        with self._lock:
+            rows = list(self._rows)
+            self._rows.clear()
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not rows:
+            return 0
+        
+        db = SessionLocal()
+        if db is None:
+            logger.warning("No database session available, dropping %d audit rows", len(rows))
+            return 0
+        repo = AuditRepository(db)
+        try:
+            return repo.bulk_create_audit_logs(rows)
+        except Exception:
+            logger.exception("Batch insert of %d audit rows failed, retrying them one at a time", len(rows))
+            repo.rollback()
+            return self._write_one_at_a_time(repo, rows)
+        finally:
+            db.close()
+    
+    @staticmethod
+    def _write_one_at_a_time(repo: AuditRepository, rows: List[Dict[str, Any]]) -> int:
+        """Write each row in its own transaction, dropping only the rows that still fail"""
+        written = 0
+        for row in rows:
+            try:
+                written += repo.bulk_create_audit_logs([row])
+            except Exception as e:
+                repo.rollback()
+                logger.warning("Dropping audit row for action %r: %s", row.get("action"), e)
+        return written
+
+
+audit_log_buffer = AuditLogBuffer()
+
+
+def _require_session(db: Session) -> None:
+    """Repositories must share the caller's request-scoped session"""
+    if db is None:
+        raise ValueError("A database session is required; pass the request's session (Depends(get_db))")
+
+
 # Convenience functions for getting repository instances
-def get_customer_repo(db: Session = None) -> CustomerRepository:
+def get_customer_repo(db: Session) -> CustomerRepository:
     """Get customer repository instance"""
-    if not db:
-        db = next(get_db())
+    _require_session(db)
     return CustomerRepository(db)
 
-def get_document_repo(db: Session = None) -> DocumentRepository:
+def get_document_repo(db: Session) -> DocumentRepository:
     """Get document repository instance"""
-    if not db:
-        db = next(get_db())
+    _require_session(db)
     return DocumentRepository(db)
 
-def get_session_repo(db: Session = None) -> KYCSessionRepository:
+def get_session_repo(db: Session) -> KYCSessionRepository:
     """Get KYC session repository instance"""
-    if not db:
-        db = next(get_db())
+    _require_session(db)
     return KYCSessionRepository(db)
 
-def get_user_repo(db: Session = None) -> UserRepository:
-    """Get user repository instance"""
-    if not db:
-        db = next(get_db())
-    return UserRepository(db)
+def get_kyc_session_repo(db: Session) -> KYCSessionRepository:
+    """Get KYC session repository instance (the name the services import)"""
+    return get_session_repo(db)
+
+def get_user_repo(db: Session) -> UserRepository:
+    """Get user repository instance, cached on the session"""
+    _require_session(db)
+    repo = db.info.get("user_repo")
+    if repo is None:
+        repo = db.info["user_repo"] = UserRepository(db)
+    return repo
 
-def get_audit_repo(db: Session = None) -> AuditRepository:
+def get_audit_repo(db: Session) -> AuditRepository:
     """Get audit repository instance"""
-    if not db:
-        db = next(get_db())
+    _require_session(db)
     return AuditRepository(db)
@@ -2,12 +2,21 @@
 Pydantic models for customer management API
 """
 from datetime import date, datetime
-from typing import Optional, List
-from pydantic import BaseModel, Field, EmailStr, validator
+from typing import Dict, Optional, List
+from pydantic import BaseModel, Field, EmailStr, field_validator
 from enum import Enum
 
 from database.models import KYCStatus, RiskLevel
 
+# Formatting characters allowed in phone numbers, removed in one pass before the digit check
+_PHONE_STRIP_TABLE = str.maketrans("", "", "+- ()")
+
+
+def _validate_phone(v: Optional[str]) -> Optional[str]:
+    if v and not v.translate(_PHONE_STRIP_TABLE).isdigit():
+        raise ValueError('Phone number must contain only digits, spaces, hyphens, parentheses, and plus sign')
+    return v
+
 
 class CustomerBase(BaseModel):
     """Base customer model"""
@@ -31,11 +40,10 @@ class CustomerCreate(CustomerBase):
     risk_level: Optional[RiskLevel] = RiskLevel.MEDIUM
     notes: Optional[str] = None
 
-    @validator('phone')
+    @field_validator('phone')
+    @classmethod
     def validate_phone(cls, v):
-        if v and not v.replace('+', '').replace('-', '').replace(' ', '').replace('(', '').replace(')', '').isdigit():
-            raise ValueError('Phone number must contain only digits, spaces, hyphens, parentheses, and plus sign')
-        return v
+        return _validate_phone(v)
 
 
 class CustomerUpdate(BaseModel):
@@ -55,11 +63,10 @@ class CustomerUpdate(BaseModel):
     is_active: Optional[bool] = None
     notes: Optional[str] = None
 
-    @validator('phone')
+    @field_validator('phone')
+    @classmethod
     def validate_phone(cls, v):
-        if v and not v.replace('+', '').replace('-', '').replace(' ', '').replace('(', '').replace(')', '').isdigit():
-            raise ValueError('Phone number must contain only digits, spaces, hyphens, parentheses, and plus sign')
-        return v
+        return _validate_phone(v)
 
 
 class CustomerResponse(CustomerBase):
@@ -90,6 +97,7 @@ class CustomerSearch(BaseModel):
     created_before: Optional[datetime] = Field(None, description="Filter by creation date (before)")
     limit: Optional[int] = Field(50, ge=1, le=1000, description="Maximum number of results")
     offset: Optional[int] = Field(0, ge=0, description="Number of results to skip")
+    cursor: Optional[str] = Field(None, description="Keyset cursor from a previous page (overrides offset)")
 
 
 class KYCStatusUpdate(BaseModel):
@@ -103,8 +111,8 @@ class CustomerStatistics(BaseModel):
     total_customers: int
     active_customers: int
     inactive_customers: int
-    kyc_status_breakdown: dict
-    risk_level_breakdown: dict
+    kyc_status_breakdown: Dict[str, int]
+    risk_level_breakdown: Dict[str, int]
     recent_registrations: int  # Last 30 days
     pending_kyc_count: int
     approved_kyc_count: int
@@ -147,8 +155,9 @@ class CustomerDetailResponse(CustomerResponse):
 class CustomerListResponse(BaseModel):
     """Paginated customer list response"""
     customers: List[CustomerResponse]
-    total_count: int
+    total_count: Optional[int] = None  # Only counted when no cursor is given
     page: int
     page_size: int
     has_next: bool
     has_previous: bool
+    next_cursor: Optional[str] = None
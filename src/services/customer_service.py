@@ -4,7 +4,8 @@ Handles customer profile management, KYC status tracking, and document associati
 """
 import uuid
 from datetime import datetime, timezone
-from typing import List, Optional, Dict, Any
+from enum import Enum
+from typing import List, Optional, Dict, Any, Tuple
 from sqlalchemy.orm import Session
 from sqlalchemy import or_, and_
 
@@ -15,6 +16,29 @@ from auth.models import User, Permission
 from utils.audit_logger import log_security_event, AuditLevel
 
 
+def _loggable_value(value: Any) -> Any:
+    """Enum members, dates and lists of them in a JSON-safe form"""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return [_loggable_value(item) for item in value]
+    return value
+
+
+def _loggable_filters(filters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Search filters as JSON-safe audit details
+    
+    The decoded ``after`` keyset (a datetime and UUID) is logged only as a
+    cursor_page flag.
+    """
+    loggable = {key: _loggable_value(value) for key, value in (filters or {}).items() if key != "after"}
+    if filters and "after" in filters:
+        loggable["cursor_page"] = True
+    return loggable
+
+
 class CustomerService:
     """Service for managing customer data and KYC processes"""
     
@@ -85,6 +109,59 @@ class CustomerService:
         finally:
             db.close()
     
+    def get_customer_detail(self, customer_id: str, requesting_user_id: str,
+                            include_documents: bool = True,
+                            include_sessions: bool = True) -> Optional[Dict[str, Any]]:
+        """Get customer with documents and KYC sessions in a single session"""
+        db = SessionLocal()
+        
+        try:
+            customer_repo = get_customer_repo(db)
+            db_customer = customer_repo.get_customer_with_related(
+                customer_id, include_documents, include_sessions
+            )
+            
+            if not db_customer:
+                return None
+            
+            # Log customer access
+            log_security_event(
+                event_type="customer_accessed",
+                description=f"Customer profile accessed: {db_customer.first_name} {db_customer.last_name}",
+                severity=AuditLevel.INFO,
+                user_id=requesting_user_id,
+                additional_details={"customer_id": customer_id}
+            )
+            
+            customer_data = self._format_customer_response(db_customer)
+            customer_data['documents'] = []
+            customer_data['kyc_sessions'] = []
+            
+            if include_documents:
+                db_documents = sorted(db_customer.documents, key=lambda doc: doc.uploaded_at, reverse=True)
+                
+                # Log document access
+                log_security_event(
+                    event_type="customer_documents_accessed",
+                    description=f"Customer documents accessed for customer: {customer_id}",
+                    severity=AuditLevel.INFO,
+                    user_id=requesting_user_id,
+                    additional_details={
+                        "customer_id": customer_id,
+                        "documents_count": len(db_documents)
+                    }
+                )
+                customer_data['documents'] = [self._format_document_response(doc) for doc in db_documents]
+            
+            if include_sessions:
+                db_sessions = sorted(db_customer.kyc_sessions, key=lambda session: session.created_at, reverse=True)
+                customer_data['kyc_sessions'] = [self._format_kyc_session_response(session) for session in db_sessions]
+            
+            return customer_data
+            
+        finally:
+            db.close()
+    
     def update_customer(self, customer_id: str, updates: Dict[str, Any], updated_by_user_id: str) -> Optional[Dict[str, Any]]:
         """Update customer information"""
         db = SessionLocal()
@@ -120,13 +197,17 @@ class CustomerService:
         finally:
             db.close()
     
-    def search_customers(self, query: str, filters: Dict[str, Any] = None, requesting_user_id: str = None) -> List[Dict[str, Any]]:
-        """Search customers with filters"""
+    def search_customers(self, query: str, filters: Dict[str, Any] = None,
+                         requesting_user_id: str = None) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """Search customers with filters, returning the page and the total match count
+        
+        The total is None for cursor pages; it is reported with the first page.
+        """
         db = SessionLocal()
         
         try:
             customer_repo = get_customer_repo(db)
-            db_customers = customer_repo.search_customers(query, filters)
+            db_customers, total_count = customer_repo.search_customers_with_total(query, filters)
             
             # Log search activity
             if requesting_user_id:
@@ -137,12 +218,13 @@ class CustomerService:
                     user_id=requesting_user_id,
                     additional_details={
                         "query": query,
-                        "filters": filters,
-                        "results_count": len(db_customers)
+                        "filters": _loggable_filters(filters),
+                        "results_count": len(db_customers),
+                        "total_count": total_count
                     }
                 )
             
-            return [self._format_customer_response(customer) for customer in db_customers]
+            return [self._format_customer_response(customer) for customer in db_customers], total_count
             
         finally:
             db.close()
@@ -14,7 +14,7 @@ from dotenv import load_dotenv
 from models.kyc_models import DocumentType, DocumentMetadata, DocumentStatus
 from utils.audit_logger import log_document_upload, log_document_processing, log_pii_access, log_security_event, AuditLevel
 from services.pii_redaction import detect_and_redact_image, detect_and_redact_text
-from services.authenticity_checker import verify_document_authenticity
+from services.authenticity_checker import verify_document_authenticity_async
 
 load_dotenv()
 
@@ -206,7 +206,7 @@ class DocumentUploadService:
         try:
             # 1. Document Authenticity Check
             if self._is_image_file(file_content):
-                authenticity_result = verify_document_authenticity(
+                authenticity_result = await verify_document_authenticity_async(
                     file_content, document_type.value
                 )
                 security_results["security_checks"]["authenticity"] = authenticity_result
@@ -4,6 +4,7 @@ Tracks all document processing activities for compliance and security
 """
 import json
 import logging
+import uuid
 from datetime import datetime, timezone
 from typing import Dict, Any, Optional
 from pathlib import Path
@@ -56,6 +57,16 @@ class AuditLogger:
         
         self.logger.addHandler(file_handler)
         self.logger.propagate = False  # Prevent duplicate logs in main logger
+        
+        # Optional batching writer for the audit_logs table (attached at app startup)
+        self._db_buffer = None
+    
+    def attach_db_buffer(self, buffer):
+        """Also persist audit events to the database through a batching buffer
+        
+        Pass None to stop queueing database rows.
+        """
+        self._db_buffer = buffer
     
     def log_audit_event(
         self,
@@ -92,6 +103,28 @@ class AuditLogger:
             self.logger.warning(log_message)
         else:
             self.logger.info(log_message)
+        
+        if self._db_buffer is not None:
+            self._db_buffer.add(self._to_db_row(audit_record))
+    
+    @staticmethod
+    def _to_db_row(audit_record: Dict[str, Any]) -> Dict[str, Any]:
+        """Map an audit record onto audit_logs columns"""
+        try:
+            user_id = uuid.UUID(audit_record["user_id"])
+        except (TypeError, ValueError):
+            user_id = None  # anonymous or non-database users
+        
+        return {
+            "action": audit_record["action"],
+            "status": audit_record["level"],
+            "user_id": user_id,
+            "resource_type": "document" if audit_record["document_id"] else None,
+            "resource_id": audit_record["document_id"],
+            "ip_address": audit_record["ip_address"],
+            "user_agent": audit_record["user_agent"],
+            "event_data": audit_record["details"]
+        }
     
     def log_document_upload(
         self,
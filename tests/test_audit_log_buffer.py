@@ -0,0 +1,160 @@
+"""
+Tests for the batching AuditLogBuffer, the audit row bulk insert and the lookup id cache
+"""
+import threading
+import time
+import uuid
+
+import pytest
+
+from database import repositories as repositories_module
+from database.repositories import AuditLogBuffer, AuditRepository, _AuditLookupCache
+
+
+class FakeSession:
+    def __init__(self):
+        self.closed = False
+        self.rollbacks = 0
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+class FakeAuditRepository:
+    """Records written batches; a batch containing a row marked bad fails"""
+
+    batches = []
+
+    def __init__(self, db):
+        self.db = db
+
+    def bulk_create_audit_logs(self, rows):
+        if any(row.get("bad") for row in rows):
+            raise RuntimeError("insert failed")
+        self.batches.append([row["action"] for row in rows])
+        return len(rows)
+
+    def rollback(self):
+        self.db.rollback()
+
+
+@pytest.fixture
+def sessions(monkeypatch):
+    sessions = []
+
+    def session_local():
+        sessions.append(FakeSession())
+        return sessions[-1]
+
+    FakeAuditRepository.batches = []
+    monkeypatch.setattr(repositories_module, "SessionLocal", session_local)
+    monkeypatch.setattr(repositories_module, "AuditRepository", FakeAuditRepository)
+    return sessions
+
+
+def test_full_buffer_flushes_in_one_batch(sessions):
+    buffer = AuditLogBuffer(max_size=3, flush_interval=60)
+
+    for action in ("a", "b", "c"):
+        buffer.add({"action": action})
+
+    assert FakeAuditRepository.batches == [["a", "b", "c"]]
+    assert buffer._timer is None
+    assert len(sessions) == 1 and sessions[0].closed
+
+
+def test_timer_flushes_partial_buffer(sessions):
+    buffer = AuditLogBuffer(max_size=100, flush_interval=0.05)
+
+    buffer.add({"action": "a"})
+    buffer.add({"action": "b"})
+    deadline = time.monotonic() + 5
+    while not FakeAuditRepository.batches and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert FakeAuditRepository.batches == [["a", "b"]]
+    assert buffer.flush() == 0
+
+
+def test_failed_batch_falls_back_to_single_rows(sessions):
+    buffer = AuditLogBuffer(max_size=100, flush_interval=60)
+    for row in ({"action": "a"}, {"action": "b", "bad": True}, {"action": "c"}):
+        buffer.add(row)
+
+    assert buffer.flush() == 2
+
+    assert FakeAuditRepository.batches == [["a"], ["c"]]
+    assert sessions[0].rollbacks == 2
+    assert sessions[0].closed
+
+
+class _UserIdQuery:
+    def __init__(self, known):
+        self.known = known
+
+    def filter(self, *criteria):
+        return self
+
+    def __iter__(self):
+        return iter([(user_id,) for user_id in self.known])
+
+
+class _RecordingSession:
+    def __init__(self, known_user_ids):
+        self.known_user_ids = known_user_ids
+        self.inserted = []
+
+    def query(self, *entities):
+        return _UserIdQuery(self.known_user_ids)
+
+    def execute(self, statement, rows):
+        self.inserted.extend(rows)
+
+    def commit(self):
+        pass
+
+
+def test_bulk_insert_nulls_unknown_users():
+    known, unknown = uuid.uuid4(), uuid.uuid4()
+    session = _RecordingSession([known])
+
+    written = AuditRepository(session).bulk_create_audit_logs([
+        {"action": "a", "status": "info", "user_id": known},
+        {"action": "b", "status": "info", "user_id": unknown},
+        {"action": "c", "status": "info", "user_id": None},
+    ])
+
+    assert written == 3
+    assert [row["user_id"] for row in session.inserted] == [known, None, None]
+
+
+def test_lookup_cache_evicts_least_recently_used_ids():
+    cache = _AuditLookupCache(maxsize=2)
+    cache.update({("ip_addresses", "10.0.0.1"): 1, ("ip_addresses", "10.0.0.2"): 2})
+    cache.get(("ip_addresses", "10.0.0.1"))
+
+    cache.update({("user_agents", "curl/8"): 3})
+
+    assert cache.get(("ip_addresses", "10.0.0.2")) is None
+    assert cache.get(("ip_addresses", "10.0.0.1")) == 1
+    assert cache.get(("user_agents", "curl/8")) == 3
+
+
+def test_lookup_cache_stays_bounded_under_concurrent_writers():
+    cache = _AuditLookupCache(maxsize=50)
+
+    def publish(worker):
+        for i in range(500):
+            cache.update({("user_agents", f"{worker}-{i}"): i + 1})
+
+    threads = [threading.Thread(target=publish, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(cache._ids) == 50
+    assert cache.get(("user_agents", "0-499")) in (None, 500)
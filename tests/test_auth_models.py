@@ -0,0 +1,39 @@
+"""
+Tests for building auth users from database rows
+"""
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+from auth.models import User, UserRole
+
+
+def _db_user(**overrides):
+    values = dict(
+        user_id=uuid.UUID("0192b3c4-d5e6-7f80-9a1b-2c3d4e5f6a7b"), username="alice", email="alice@example.com",
+        role=UserRole.ANALYST, is_active=True, created_at=datetime(2024, 1, 1), last_login_at=datetime(2024, 2, 1),
+        failed_login_attempts=3, locked_until=None, department="Compliance", supervisor_id=None
+    )
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+def test_from_db_copies_row_fields():
+    user = User.from_db(_db_user())
+
+    assert user.user_id == "0192b3c4-d5e6-7f80-9a1b-2c3d4e5f6a7b"
+    assert user.username == "alice"
+    assert user.role is UserRole.ANALYST
+    assert user.last_login == datetime(2024, 2, 1)
+    assert user.failed_login_attempts == 3
+    assert user.department == "Compliance"
+    assert user.supervisor_id is None
+
+
+def test_from_db_normalizes_optional_columns():
+    supervisor_id = uuid.uuid4()
+
+    user = User.from_db(_db_user(failed_login_attempts=None, supervisor_id=supervisor_id))
+
+    assert user.failed_login_attempts == 0
+    assert user.supervisor_id == str(supervisor_id)
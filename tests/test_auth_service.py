@@ -0,0 +1,141 @@
+"""
+Tests for the login, lockout and success paths in AuthService.authenticate_user
+"""
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from auth import auth_service as auth_module
+from auth.auth_service import AuthService, AuthenticationError
+from auth.jwt_service import jwt_manager
+from auth.models import UserRole
+
+PASSWORD = "correct horse battery staple"
+
+
+class FakeSession:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeUserRepo:
+    def __init__(self, user):
+        self.user = user
+        self.lookups = []
+        self.bumps = []
+        self.successful_logins = []
+
+    def get_user_by_username(self, username, use_cache=False):
+        self.lookups.append((username, use_cache))
+        return self.user if self.user and self.user.username == username else None
+
+    def bump_failed_login(self, user_id, threshold=5, lock_duration=None):
+        self.bumps.append(user_id)
+        self.user.failed_login_attempts += 1
+        if self.user.failed_login_attempts >= threshold:
+            self.user.locked_until = datetime.now(timezone.utc).replace(tzinfo=None) + lock_duration
+        return SimpleNamespace(failed_login_attempts=self.user.failed_login_attempts,
+                               locked_until=self.user.locked_until)
+
+    def record_successful_login(self, user_id):
+        self.successful_logins.append(user_id)
+
+    def update_user(self, user_id, updates):
+        pass
+
+
+def _db_user(**overrides):
+    values = dict(
+        user_id="u-1", username="alice", email="alice@example.com", role=UserRole.ANALYST, is_active=True,
+        created_at=datetime(2024, 1, 1), last_login_at=None, failed_login_attempts=0,
+        locked_until=None, department=None, supervisor_id=None,
+        password_hash=jwt_manager.hash_password(PASSWORD)
+    )
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+@pytest.fixture
+def session():
+    return FakeSession()
+
+
+@pytest.fixture
+def repo(monkeypatch, session):
+    repo = FakeUserRepo(_db_user())
+    monkeypatch.setattr(auth_module, "get_db", lambda: session)
+    monkeypatch.setattr(auth_module, "get_user_repo", lambda db: repo)
+    monkeypatch.setattr(auth_module, "log_security_event", lambda **kwargs: None)
+    return repo
+
+
+def test_successful_login_returns_tokens_and_resets_attempts(repo, session):
+    tokens = AuthService().authenticate_user("alice", PASSWORD)
+
+    assert jwt_manager.verify_token(tokens["access_token"])["sub"] == "u-1"
+    assert repo.successful_logins == ["u-1"]
+    assert repo.bumps == []
+    assert session.closed
+
+
+def test_login_bypasses_user_cache(repo):
+    AuthService().authenticate_user("alice", PASSWORD)
+
+    assert repo.lookups == [("alice", False)]
+
+
+def test_unknown_username_is_rejected(repo):
+    with pytest.raises(AuthenticationError) as exc_info:
+        AuthService().authenticate_user("mallory", PASSWORD)
+    assert exc_info.value.status_code == 401
+    assert exc_info.value.detail == "Invalid credentials"
+
+
+def test_wrong_password_counts_failed_attempt(repo):
+    with pytest.raises(AuthenticationError) as exc_info:
+        AuthService().authenticate_user("alice", "wrong password")
+    assert exc_info.value.detail == "Invalid credentials"
+    assert repo.bumps == ["u-1"]
+    assert repo.successful_logins == []
+
+
+def test_repeated_failures_lock_account(repo):
+    service = AuthService()
+    for _ in range(5):
+        with pytest.raises(AuthenticationError):
+            service.authenticate_user("alice", "wrong password")
+
+    with pytest.raises(AuthenticationError) as exc_info:
+        service.authenticate_user("alice", PASSWORD)
+    assert exc_info.value.detail == "Account is locked"
+    assert len(repo.bumps) == 5
+    assert repo.successful_logins == []
+
+
+def test_locked_account_is_rejected_without_counting_attempt(repo):
+    repo.user.locked_until = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(hours=1)
+
+    with pytest.raises(AuthenticationError) as exc_info:
+        AuthService().authenticate_user("alice", PASSWORD)
+    assert exc_info.value.detail == "Account is locked"
+    assert repo.bumps == []
+
+
+def test_expired_lock_allows_login(repo):
+    repo.user.locked_until = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(minutes=1)
+
+    AuthService().authenticate_user("alice", PASSWORD)
+
+    assert repo.successful_logins == ["u-1"]
+
+
+def test_inactive_account_is_rejected(repo):
+    repo.user.is_active = False
+
+    with pytest.raises(AuthenticationError) as exc_info:
+        AuthService().authenticate_user("alice", PASSWORD)
+    assert exc_info.value.detail == "Account is inactive"
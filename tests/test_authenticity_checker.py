@@ -0,0 +1,246 @@
+"""
+Tests for the document authenticity checker's dedup store, analysis cache and text detection
+"""
+import numpy as np
+import pytest
+
+from services import authenticity_checker as checker_module
+from services.authenticity_checker import (
+    AnalysisCache, AuthenticityCheck, DedupStore, DocumentAuthenticityChecker, FraudIndicator, _content_hash
+)
+
+
+class FakeRedis:
+    """The SET NX / GET / SETEX subset of redis-py, shared between stores like a real server"""
+
+    def __init__(self):
+        self.values = {}
+
+    def set(self, key, value, nx=False):
+        if nx and key in self.values:
+            return None
+        self.values[key] = value
+        return True
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def setex(self, key, ttl, value):
+        self.values[key] = value
+
+
+class BrokenRedis:
+    def set(self, *args, **kwargs):
+        raise ConnectionError("redis down")
+
+
+@pytest.fixture(autouse=True)
+def no_redis(monkeypatch):
+    monkeypatch.delenv("REDIS_URL", raising=False)
+
+
+def _store(redis=None, local_cache_size=100):
+    store = DedupStore(local_cache_size=local_cache_size)
+    store._redis = redis
+    return store
+
+
+def test_digest_is_new_once_then_seen():
+    store = _store()
+    digest = _content_hash(b"passport scan")
+
+    assert store.seen(digest) is False
+    assert store.seen(digest) is True
+    assert store.seen(_content_hash(b"another scan")) is False
+
+
+def test_redis_shares_digests_between_workers():
+    redis = FakeRedis()
+    first_worker, second_worker = _store(redis), _store(redis)
+    digest = _content_hash(b"passport scan")
+
+    assert first_worker.seen(digest) is False
+    assert second_worker.seen(digest) is True
+    assert list(redis.values) == [DedupStore.KEY_PREFIX + digest]
+
+
+def test_unreachable_redis_falls_back_to_process_memory():
+    store = _store(BrokenRedis())
+    digest = _content_hash(b"passport scan")
+
+    assert store.seen(digest) is False
+    assert store.seen(digest) is True
+
+
+def test_local_cache_is_bounded():
+    store = _store(local_cache_size=2)
+    digests = [_content_hash(bytes([i])) for i in range(3)]
+    for digest in digests:
+        store.seen(digest)
+
+    assert list(store._local) == digests[1:]
+
+
+def test_resubmitted_document_is_flagged_as_duplicate():
+    checker = DocumentAuthenticityChecker()
+    digest = _content_hash(b"passport scan")
+
+    assert checker._check_duplicate_content(digest) == []
+    [check] = checker._check_duplicate_content(digest)
+    assert check.indicator_type == FraudIndicator.DUPLICATE_DETECTION
+    assert check.details == {"hash": digest.hex()}
+
+
+def _tampering_check(**details):
+    return AuthenticityCheck(
+        indicator_type=FraudIndicator.DIGITAL_TAMPERING,
+        confidence=np.float64(0.75),
+        description="Possible digital tampering detected",
+        severity="high",
+        details={"ela_score": np.float32(12.5), **details},
+        coordinates=(1, 2, 3, 4)
+    )
+
+
+class CountingChecker(DocumentAuthenticityChecker):
+    """Checker whose analysis returns canned checks and counts its runs"""
+
+    def __init__(self, checks):
+        super().__init__()
+        self.checks = checks
+        self.analyses = 0
+
+    def _analyze_document(self, image_data, document_type):
+        self.analyses += 1
+        return list(self.checks), False
+
+
+def test_identical_upload_reuses_the_analysis():
+    checker = CountingChecker([_tampering_check()])
+
+    first = checker.verify_document_authenticity(b"passport scan", "passport")
+    second = checker.verify_document_authenticity(b"passport scan", "passport")
+
+    assert checker.analyses == 1
+    assert second["detailed_checks"][0] == first["detailed_checks"][0]
+    # The duplicate check is never cached, so only the repeat is flagged
+    assert [c["type"] for c in first["detailed_checks"]] == ["digital_tampering"]
+    assert [c["type"] for c in second["detailed_checks"]] == ["digital_tampering", "duplicate_detection"]
+
+
+def test_document_type_is_part_of_the_cache_key():
+    checker = CountingChecker([_tampering_check()])
+
+    checker.verify_document_authenticity(b"passport scan", "passport")
+    checker.verify_document_authenticity(b"passport scan", "drivers_license")
+
+    assert checker.analyses == 2
+
+
+def test_errored_analysis_is_not_cached():
+    checker = CountingChecker([_tampering_check(error="Azure endpoint unreachable")])
+
+    checker.verify_document_authenticity(b"passport scan", "passport")
+    checker.verify_document_authenticity(b"passport scan", "passport")
+
+    assert checker.analyses == 2
+
+
+def test_redis_cache_round_trips_checks():
+    cache = AnalysisCache()
+    cache._redis = FakeRedis()
+    digest = _content_hash(b"passport scan")
+
+    cache.set(digest, "Passport", [_tampering_check()], True)
+    [check], azure_analysis_used = cache.get(digest, "passport")
+
+    assert azure_analysis_used is True
+    assert check == AuthenticityCheck(
+        indicator_type=FraudIndicator.DIGITAL_TAMPERING,
+        confidence=0.75,
+        description="Possible digital tampering detected",
+        severity="high",
+        details={"ela_score": 12.5},
+        coordinates=(1, 2, 3, 4)
+    )
+
+
+def test_local_cache_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(checker_module.time, "monotonic", lambda: now[0])
+    cache = AnalysisCache(ttl=60)
+    digest = _content_hash(b"passport scan")
+    cache.set(digest, "passport", [_tampering_check()], False)
+
+    now[0] += 59
+    assert cache.get(digest, "passport") is not None
+    now[0] += 1
+    assert cache.get(digest, "passport") is None
+
+
+class FakeEastNet:
+    """One confident score cell at (row 2, col 3) with a 16x8 axis-aligned box"""
+
+    def setInput(self, blob):
+        self.input_shape = blob.shape
+
+    def forward(self, layer_names):
+        _, _, h, w = self.input_shape
+        scores = np.zeros((1, 1, h // 4, w // 4), dtype=np.float32)
+        geometry = np.zeros((1, 5, h // 4, w // 4), dtype=np.float32)
+        scores[0, 0, 2, 3] = 0.9
+        geometry[0, :4, 2, 3] = [4, 8, 4, 8]  # top, right, bottom, left distances; angle 0
+        return scores, geometry
+
+
+def _text_like_image():
+    image = np.full((64, 64), 255, dtype=np.uint8)
+    image[20:40, 10:50] = 0
+    return image
+
+
+def test_east_boxes_are_decoded_from_the_score_map(monkeypatch):
+    monkeypatch.setattr(checker_module, "_get_east_net", lambda: FakeEastNet())
+    checker = DocumentAuthenticityChecker()
+
+    assert checker._detect_text_boxes_east(_text_like_image()) == [(4, 4, 16, 8)]
+    [region] = checker._find_text_regions(_text_like_image())
+    assert region.shape == (8, 16)
+
+
+def test_text_regions_fall_back_to_mser_without_east(monkeypatch):
+    monkeypatch.setattr(checker_module, "_get_east_net", lambda: None)
+    checker = DocumentAuthenticityChecker()
+    monkeypatch.setattr(checker, "_detect_text_boxes_mser", lambda gray: [(10, 20, 40, 20), (0, 0, 0, 5)])
+
+    [region] = checker._find_text_regions(_text_like_image())
+
+    assert region.shape == (20, 40)
+
+
+class FakeMser:
+    def setMaxArea(self, max_area):
+        self.max_area = max_area
+
+    def detectRegions(self, gray):
+        regions = [np.zeros((120, 2)), np.zeros((30, 2))]
+        return regions, np.array([[1, 2, 10, 12], [5, 5, 3, 3]])
+
+
+def test_mser_bounds_region_area_and_drops_specks(monkeypatch):
+    mser = FakeMser()
+    monkeypatch.setattr(checker_module._cv_detectors(), "mser", mser)
+
+    boxes = DocumentAuthenticityChecker()._detect_text_boxes_mser(np.zeros((200, 300), dtype=np.uint8))
+
+    assert mser.max_area == 200 * 300 // 10
+    assert boxes == [(1, 2, 10, 12)]
+
+
+def test_missing_east_model_is_reported_unavailable(monkeypatch):
+    monkeypatch.setattr(checker_module, "EAST_MODEL_PATH", "/nonexistent/frozen_east_text_detection.pb")
+    monkeypatch.setattr(checker_module, "_east_net", None)
+    monkeypatch.setattr(checker_module, "_east_unavailable", False)
+
+    assert checker_module._get_east_net() is None
+    assert checker_module._east_unavailable is True
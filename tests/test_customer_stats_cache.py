@@ -0,0 +1,43 @@
+"""
+Tests for the per-process customer statistics snapshot
+"""
+from database import repositories as repositories_module
+from database.repositories import _CustomerStatsCache
+
+
+def _stats():
+    return {"total_customers": 3, "kyc_status_breakdown": {"pending": 2, "approved": 1}}
+
+
+def test_callers_cannot_change_the_cached_snapshot():
+    cache = _CustomerStatsCache(ttl=60)
+    stats = _stats()
+    cache.set(stats)
+
+    stats["kyc_status_breakdown"]["pending"] = 99
+    first = cache.get()
+    first["kyc_status_breakdown"]["approved"] = 99
+    first["total_customers"] = 0
+
+    assert cache.get() == _stats()
+
+
+def test_snapshot_expires_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(repositories_module.time, "monotonic", lambda: now[0])
+    cache = _CustomerStatsCache(ttl=60)
+    cache.set(_stats())
+
+    now[0] += 59
+    assert cache.get() == _stats()
+    now[0] += 1
+    assert cache.get() is None
+
+
+def test_invalidate_drops_the_snapshot():
+    cache = _CustomerStatsCache(ttl=60)
+    cache.set(_stats())
+
+    cache.invalidate()
+
+    assert cache.get() is None
@@ -0,0 +1,192 @@
+"""
+Tests for the HS256 token encoding and verification in JWTManager
+"""
+import base64
+import json
+from datetime import timedelta
+
+import jwt
+import pytest
+from fastapi import HTTPException
+
+from auth.jwt_service import JWTManager, TOKEN_TYPE_REFRESH
+from auth.models import User, UserRole
+
+
+@pytest.fixture
+def manager():
+    return JWTManager()
+
+
+@pytest.fixture
+def user():
+    return User(user_id="u-1", username="alice", email="alice@example.com", role=UserRole.ANALYST)
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def test_access_token_round_trip(manager, user):
+    tokens = manager.create_token_pair(user)
+
+    payload = manager.verify_token(tokens["access_token"])
+
+    assert payload["sub"] == "u-1"
+    assert payload["username"] == "alice"
+    assert payload["role"] == "analyst"
+    assert manager.get_user_from_token(tokens["access_token"]) == {
+        "user_id": "u-1", "username": "alice", "role": UserRole.ANALYST
+    }
+
+
+def test_tokens_verify_with_pyjwt(manager, user):
+    token = manager.create_access_token(user.user_id, user.username, user.role.value, user.email)
+
+    payload = jwt.decode(token, manager.secret_key, algorithms=["HS256"])
+
+    assert payload["sub"] == "u-1"
+
+
+def test_refresh_token_only_verifies_as_refresh(manager, user):
+    refresh_token = manager.create_token_pair(user)["refresh_token"]
+
+    assert manager.verify_token(refresh_token, TOKEN_TYPE_REFRESH)["sub"] == "u-1"
+    with pytest.raises(HTTPException) as exc_info:
+        manager.verify_token(refresh_token)
+    assert exc_info.value.status_code == 401
+    assert exc_info.value.detail == "Invalid token type"
+
+
+def test_tampered_payload_is_rejected(manager, user):
+    token = manager.create_access_token(user.user_id, user.username, user.role.value, user.email)
+    header, payload, signature = token.split(".")
+    claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+    claims["role"] = "admin"
+    forged = ".".join([header, _b64(json.dumps(claims).encode()), signature])
+
+    with pytest.raises(HTTPException) as exc_info:
+        manager.verify_token(forged)
+    assert exc_info.value.status_code == 401
+    assert "Signature verification failed" in exc_info.value.detail
+
+
+@pytest.mark.parametrize("claims_change", [{"exp": 1}, {"t": TOKEN_TYPE_REFRESH}])
+def test_signature_is_checked_before_claims(manager, user, claims_change):
+    token = manager.create_access_token(user.user_id, user.username, user.role.value, user.email)
+    header, payload, signature = token.split(".")
+    claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+    claims.update(claims_change)
+    forged = ".".join([header, _b64(json.dumps(claims).encode()), signature])
+
+    with pytest.raises(HTTPException) as exc_info:
+        manager.verify_token(forged)
+    assert exc_info.value.detail == "Invalid token: Signature verification failed"
+
+
+def test_token_signed_with_another_key_is_rejected(manager, user):
+    token = jwt.encode({"sub": "u-1", "exp": 4102444800, "t": 0},
+                       "a-different-secret-key-of-32-bytes-or-more", algorithm="HS256")
+
+    with pytest.raises(HTTPException) as exc_info:
+        manager.verify_token(token)
+    assert exc_info.value.status_code == 401
+
+
+@pytest.mark.parametrize("token", ["", "not-a-token", "a.b", "a.b.c"])
+def test_malformed_token_is_rejected(manager, token):
+    with pytest.raises(HTTPException) as exc_info:
+        manager.verify_token(token)
+    assert exc_info.value.status_code == 401
+
+
+def _with_header(token: str, header: dict, signature: str = None) -> str:
+    _, payload, original_signature = token.split(".")
+    return ".".join([_b64(json.dumps(header).encode()), payload,
+                     original_signature if signature is None else signature])
+
+
+@pytest.mark.parametrize("header, signature", [
+    ({"alg": "none", "typ": "JWT"}, ""),
+    ({"alg": "HS512", "typ": "JWT"}, None),
+    ({"alg": "RS256", "typ": "JWT"}, None),
+    ({"typ": "JWT"}, None),
+])
+def test_other_algorithms_are_rejected(manager, user, header, signature):
+    token = manager.create_access_token(user.user_id, user.username, user.role.value, user.email)
+
+    with pytest.raises(HTTPException) as exc_info:
+        manager.verify_token(_with_header(token, header, signature))
+    assert exc_info.value.status_code == 401
+    assert "alg" in exc_info.value.detail
+
+
+@pytest.mark.parametrize("mutate", [
+    lambda token: token + ".extra",
+    lambda token: token + ".",
+    lambda token: "." + token,
+])
+def test_extra_segments_are_rejected(manager, user, mutate):
+    token = manager.create_access_token(user.user_id, user.username, user.role.value, user.email)
+
+    with pytest.raises(HTTPException) as exc_info:
+        manager.verify_token(mutate(token))
+    assert exc_info.value.status_code == 401
+    assert "three segments" in exc_info.value.detail
+
+
+@pytest.mark.parametrize("mutate", [
+    lambda token: token + "=",
+    lambda token: token + "==",
+    lambda token: token + "A",
+    lambda token: token.replace(".", ".!", 1),
+    lambda token: token.replace(".", ".+/", 1),
+])
+def test_bad_base64_is_rejected(manager, user, mutate):
+    token = manager.create_access_token(user.user_id, user.username, user.role.value, user.email)
+
+    with pytest.raises(HTTPException) as exc_info:
+        manager.verify_token(mutate(token))
+    assert exc_info.value.status_code == 401
+
+
+def test_non_ascii_token_is_rejected(manager, user):
+    token = manager.create_access_token(user.user_id, user.username, user.role.value, user.email)
+    header, payload, signature = token.split(".")
+
+    with pytest.raises(HTTPException) as exc_info:
+        manager.verify_token(".".join([header, payload + "\u00e9", signature]))
+    assert exc_info.value.status_code == 401
+    assert exc_info.value.detail == "Invalid token: Token must be ASCII"
+
+
+def test_expired_token_is_rejected(manager, user):
+    token = manager.create_access_token(user.user_id, user.username, user.role.value, user.email,
+                                        expires_delta=timedelta(seconds=-1))
+
+    with pytest.raises(HTTPException) as exc_info:
+        manager.verify_token(token)
+    assert exc_info.value.status_code == 401
+    assert exc_info.value.detail == "Token expired"
+
+
+def test_rejections_raise_distinct_exceptions(manager, user):
+    token = manager.create_access_token(user.user_id, user.username, user.role.value, user.email,
+                                        expires_delta=timedelta(seconds=-1))
+
+    errors = []
+    for _ in range(2):
+        with pytest.raises(HTTPException) as exc_info:
+            manager.verify_token(token)
+        errors.append(exc_info.value)
+
+    assert errors[0] is not errors[1]
+
+
+def test_cached_payload_is_not_shared_between_callers(manager, user):
+    token = manager.create_access_token(user.user_id, user.username, user.role.value, user.email)
+
+    first = manager.verify_token(token)
+    first["role"] = "admin"
+
+    assert manager.verify_token(token)["role"] == "analyst"
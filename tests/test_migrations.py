@@ -0,0 +1,73 @@
+"""
+Tests for the schema migration runner
+"""
+import pytest
+from sqlalchemy import create_engine, text
+
+from database import migrations
+
+
+@pytest.fixture
+def engine():
+    return create_engine("sqlite://")
+
+
+@pytest.fixture
+def existing_engine(engine):
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE customers (customer_id INTEGER PRIMARY KEY)"))
+    return engine
+
+
+def _step(name, pending, log):
+    return name, lambda conn: pending, lambda conn: log.append(name)
+
+
+def test_step_names_are_unique():
+    names = [name for name, _, _ in migrations.MIGRATIONS]
+
+    assert names
+    assert len(names) == len(set(names))
+
+
+def test_empty_database_is_left_to_create_all(engine, monkeypatch):
+    ran = []
+    monkeypatch.setattr(migrations, "MIGRATIONS", [_step("first", True, ran)])
+
+    assert migrations.migrate_schema(engine) is False
+    assert ran == []
+
+
+def test_pending_steps_run_in_order(existing_engine, monkeypatch):
+    ran = []
+    monkeypatch.setattr(migrations, "MIGRATIONS", [
+        _step("first", True, ran),
+        _step("already_applied", False, ran),
+        _step("second", True, ran),
+    ])
+
+    assert migrations.migrate_schema(existing_engine) is True
+    assert ran == ["first", "second"]
+
+
+def test_current_database_has_nothing_to_migrate(existing_engine, monkeypatch):
+    ran = []
+    monkeypatch.setattr(migrations, "MIGRATIONS", [_step("first", False, ran)])
+
+    assert migrations.migrate_schema(existing_engine) is False
+    assert ran == []
+
+
+def test_failed_step_rolls_back_earlier_steps(existing_engine, monkeypatch):
+    def fail(conn):
+        raise RuntimeError("step failed")
+
+    monkeypatch.setattr(migrations, "MIGRATIONS", [
+        ("insert", lambda conn: True, lambda conn: conn.execute(text("INSERT INTO customers VALUES (1)"))),
+        ("fail", lambda conn: True, fail),
+    ])
+
+    with pytest.raises(RuntimeError):
+        migrations.migrate_schema(existing_engine)
+    with existing_engine.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM customers")).scalar() == 0
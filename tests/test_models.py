@@ -0,0 +1,49 @@
+"""
+Tests for the SMALLINT enum column type
+"""
+import pytest
+from sqlalchemy import Column, Integer, MetaData, Table, create_engine, select
+
+from database.models import IntEnum, RiskLevel
+
+
+@pytest.fixture
+def risk_table():
+    engine = create_engine("sqlite://")
+    table = Table("risks", MetaData(), Column("id", Integer, primary_key=True), Column("level", IntEnum(RiskLevel)))
+    table.metadata.create_all(engine)
+    return engine, table
+
+
+def test_codes_follow_declaration_order():
+    column_type = IntEnum(RiskLevel)
+
+    assert [column_type.process_bind_param(level, None) for level in RiskLevel] == [0, 1, 2, 3]
+
+
+@pytest.mark.parametrize("value", [RiskLevel.HIGH, "high", "HIGH"])
+def test_member_value_or_name_round_trips_to_member(risk_table, value):
+    engine, table = risk_table
+
+    with engine.begin() as conn:
+        conn.execute(table.insert().values(level=value))
+        code = conn.exec_driver_sql("SELECT level FROM risks").scalar_one()
+        level = conn.execute(select(table.c.level)).scalar_one()
+
+    assert code == 2
+    assert level is RiskLevel.HIGH
+
+
+def test_null_round_trips(risk_table):
+    engine, table = risk_table
+
+    with engine.begin() as conn:
+        conn.execute(table.insert().values(level=None))
+        level = conn.execute(select(table.c.level)).scalar_one()
+
+    assert level is None
+
+
+def test_unknown_value_is_rejected():
+    with pytest.raises(KeyError):
+        IntEnum(RiskLevel).process_bind_param("extreme", None)
@@ -0,0 +1,143 @@
+"""
+Tests for the keyset pagination cursor and customer search queries
+"""
+import json
+import uuid
+from datetime import datetime
+
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Query, Session
+
+from database.models import RiskLevel
+from database.repositories import CustomerRepository, decode_cursor, encode_cursor
+from services import customer_service as customer_module
+from services.customer_service import CustomerService
+from utils.audit_logger import audit_logger
+
+
+def _search_sql(filters) -> str:
+    """SQL that search_customers would run for ``filters``"""
+    statements = []
+
+    class CapturingQuery(Query):
+        def all(self):
+            statements.append(str(self.statement.compile(dialect=postgresql.dialect())))
+            return []
+
+    CustomerRepository(Session(query_cls=CapturingQuery)).search_customers("", filters)
+    return statements[0]
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 5, 1, 12, 30, 15, 123456)
+    customer_id = uuid.uuid4()
+
+    cursor = encode_cursor(created_at, customer_id)
+
+    assert decode_cursor(cursor, datetime.fromisoformat, uuid.UUID) == (created_at, customer_id)
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", "bm90IGpzb24=", encode_cursor("only-one-value")])
+def test_invalid_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, datetime.fromisoformat, uuid.UUID)
+
+
+def test_cursor_page_uses_keyset_condition():
+    sql = _search_sql({"after": (datetime(2024, 5, 1), uuid.uuid4()), "limit": 20})
+
+    assert "(customers.created_at, customers.customer_id) < (" in sql
+    assert "ORDER BY customers.created_at DESC, customers.customer_id DESC" in sql
+    assert "LIMIT" in sql
+    assert "OFFSET" not in sql
+
+
+def test_first_page_uses_offset():
+    sql = _search_sql({"offset": 40, "limit": 20})
+
+    assert "OFFSET" in sql
+    assert "customers.created_at, customers.customer_id) <" not in sql
+
+
+class _CountingSession:
+    def __init__(self, total):
+        self.total = total
+        self.count_queries = 0
+
+    def query(self, *entities):
+        self.count_queries += 1
+        total = self.total
+
+        class _Query:
+            def filter(self, *criteria):
+                return self
+
+            def scalar(self):
+                return total
+
+        return _Query()
+
+
+def test_search_with_cursor_skips_total(monkeypatch):
+    session = _CountingSession(total=3)
+    repo = CustomerRepository(session)
+    monkeypatch.setattr(repo, "search_customers", lambda search_term, filters: ["page"])
+
+    customers, total = repo.search_customers_with_total("", {"after": (datetime(2024, 5, 1), uuid.uuid4())})
+
+    assert customers == ["page"]
+    assert total is None
+    assert session.count_queries == 0
+
+
+def test_search_without_cursor_counts_total(monkeypatch):
+    session = _CountingSession(total=3)
+    repo = CustomerRepository(session)
+    monkeypatch.setattr(repo, "search_customers", lambda search_term, filters: ["page"])
+
+    customers, total = repo.search_customers_with_total("", {"offset": 0, "limit": 20})
+
+    assert customers == ["page"]
+    assert total == 3
+    assert session.count_queries == 1
+
+
+class _CapturingLogger:
+    def __init__(self):
+        self.messages = []
+
+    def info(self, message):
+        self.messages.append(message)
+
+
+class _SearchRepo:
+    def __init__(self):
+        self.filters = None
+
+    def search_customers_with_total(self, search_term, filters):
+        self.filters = filters
+        return [], None
+
+
+def test_cursor_page_search_logs_json_safe_filters(monkeypatch):
+    repo = _SearchRepo()
+    logger = _CapturingLogger()
+    monkeypatch.setattr(customer_module, "SessionLocal", lambda: Session())
+    monkeypatch.setattr(customer_module, "get_customer_repo", lambda db: repo)
+    monkeypatch.setattr(audit_logger, "logger", logger)
+    cursor = encode_cursor(datetime(2024, 5, 1, 12, 30), uuid.uuid4())
+    filters = {
+        "limit": 20,
+        "after": decode_cursor(cursor, datetime.fromisoformat, uuid.UUID),
+        "created_after": datetime(2024, 1, 1),
+        "risk_level": [RiskLevel.HIGH],
+    }
+
+    customers, total = CustomerService().search_customers("smith", filters, requesting_user_id="u-1")
+
+    assert (customers, total) == ([], None)
+    assert repo.filters is filters
+    logged = json.loads(logger.messages[0])["details"]["filters"]
+    assert logged == {"limit": 20, "created_after": "2024-01-01T00:00:00",
+                      "risk_level": [RiskLevel.HIGH.value], "cursor_page": True}
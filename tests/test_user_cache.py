@@ -0,0 +1,118 @@
+"""
+Tests for the per-process user lookup cache
+"""
+import uuid
+
+import pytest
+
+from database import repositories as repositories_module
+from database.models import User, UserRole
+from database.repositories import UserRepository, _UserCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(repositories_module.time, "monotonic", clock)
+    return clock
+
+
+def _snapshot(username, user_id=None):
+    return {"user_id": user_id or uuid.uuid4(), "username": username}
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = _UserCache(maxsize=10, ttl=30)
+    cache.set_user("alice", _snapshot("alice"))
+    cache.set_role(UserRole.ANALYST, [_snapshot("alice")])
+
+    clock.now += 29
+    assert cache.get_user("alice")["username"] == "alice"
+    assert cache.get_role(UserRole.ANALYST) is not None
+
+    clock.now += 1
+    assert cache.get_user("alice") is None
+    assert cache.get_role(UserRole.ANALYST) is None
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = _UserCache(maxsize=2, ttl=30)
+    cache.set_user("alice", _snapshot("alice"))
+    cache.set_user("bob", _snapshot("bob"))
+    cache.get_user("alice")
+
+    cache.set_user("carol", _snapshot("carol"))
+
+    assert cache.get_user("bob") is None
+    assert cache.get_user("alice") is not None
+    assert cache.get_user("carol") is not None
+
+
+def test_invalidate_drops_the_user_and_every_role_list(clock):
+    cache = _UserCache(maxsize=10, ttl=30)
+    alice_id = uuid.uuid4()
+    cache.set_user("alice", _snapshot("alice", alice_id))
+    cache.set_user("bob", _snapshot("bob"))
+    cache.set_role(UserRole.ADMIN, [_snapshot("bob")])
+
+    cache.invalidate(str(alice_id))
+
+    assert cache.get_user("alice") is None
+    assert cache.get_user("bob") is not None
+    assert cache.get_role(UserRole.ADMIN) is None
+
+
+class _Result:
+    def __init__(self, user):
+        self.user = user
+
+    def scalar_one_or_none(self):
+        return self.user
+
+
+class _CountingSession:
+    def __init__(self, user):
+        self.user = user
+        self.selects = 0
+
+    def execute(self, statement, params=None):
+        self.selects += 1
+        return _Result(self.user)
+
+    def merge(self, instance, load=True):
+        return instance
+
+
+@pytest.fixture
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(repositories_module, "_user_cache", _UserCache(maxsize=10, ttl=30))
+
+
+def test_username_lookup_reads_fresh_by_default(fresh_cache):
+    session = _CountingSession(User(user_id=uuid.uuid4(), username="alice", role=UserRole.ANALYST))
+    repo = UserRepository(session)
+
+    repo.get_user_by_username("alice")
+    repo.get_user_by_username("alice")
+
+    assert session.selects == 2
+
+
+def test_username_lookup_can_opt_into_cache(fresh_cache):
+    session = _CountingSession(User(user_id=uuid.uuid4(), username="alice", role=UserRole.ANALYST))
+    repo = UserRepository(session)
+
+    repo.get_user_by_username("alice", use_cache=True)
+    cached = repo.get_user_by_username("alice", use_cache=True)
+
+    assert session.selects == 1
+    assert cached.username == "alice"
+    assert cached.role == UserRole.ANALYST